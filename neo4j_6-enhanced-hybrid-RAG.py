@@ -5,6 +5,12 @@ from dotenv import load_dotenv
 import warnings
 from typing import List, Dict, Any, Optional
 import time
+import io
+import logging
+import hashlib  # For compact document fingerprints
+import concurrent.futures
+import pickle  # For persisting the semantic cache
+import numpy as np
 
 # LangChain imports
 from langchain_community.graphs import Neo4jGraph
@@ -14,7 +20,7 @@ from langchain_community.llms import Ollama
 from langchain.schema import Document
 from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough, RunnableLambda
+from langchain_core.runnables import RunnableLambda
 from langchain.chains.llm import LLMChain
 
 # Load environment variables from .env file
@@ -24,6 +30,33 @@ warnings.filterwarnings("ignore")
 # Global verbose flag
 VERBOSE = False
 
+# Retrieval progress is logged at DEBUG level and only shown with --verbose
+logger = logging.getLogger("hybrid_rag")
+
+# Bolt connection pool settings shared by every driver in this script. Retrieval
+# runs several graph queries concurrently, so keep plenty of warm connections.
+NEO4J_DRIVER_CONFIG = {
+    "max_connection_pool_size": 100,
+    "connection_acquisition_timeout": 30,
+    "max_connection_lifetime": 3600,
+}
+
+# How long Ollama keeps the embedding and chat models loaded between calls, so
+# consecutive questions don't pay for reloading them
+OLLAMA_KEEP_ALIVE = "30m"
+
+# Reciprocal Rank Fusion constant (k=60 as in the original RRF paper)
+RRF_K = 60
+
+# Node metadata keys worth surfacing in the prompt context
+IMPORTANT_METADATA = ("id", "type", "category", "created", "source")
+
+# Semantic cache of retrieval results, keyed by normalized query embedding.
+# Entries are (embedding, payload) pairs kept in least- to most-recently-used order.
+SEMANTIC_CACHE_SIZE = 256
+SEMANTIC_CACHE_THRESHOLD = 0.95
+_semantic_cache = []
+
 def initialize_neo4j_connection():
     """Initialize and return a Neo4j graph connection."""
     # Print versions for debugging
@@ -35,11 +68,20 @@ def initialize_neo4j_connection():
     except (ImportError, AttributeError) as e:
         print(f"Could not determine package versions: {e}")
     
-    graph = Neo4jGraph(
-        url=("bolt://localhost:7687"),
-        username=os.getenv("NEO4J_USERNAME"),
-        password=os.getenv("NEO4J_PASSWORD")
-    )
+    try:
+        graph = Neo4jGraph(
+            url=("bolt://localhost:7687"),
+            username=os.getenv("NEO4J_USERNAME"),
+            password=os.getenv("NEO4J_PASSWORD"),
+            driver_config=NEO4J_DRIVER_CONFIG
+        )
+    except TypeError:
+        # Older langchain-community versions don't accept driver_config
+        graph = Neo4jGraph(
+            url=("bolt://localhost:7687"),
+            username=os.getenv("NEO4J_USERNAME"),
+            password=os.getenv("NEO4J_PASSWORD")
+        )
     return graph
 
 def initialize_embeddings(model_name="nomic-embed-text:latest"):
@@ -66,10 +108,18 @@ def initialize_embeddings(model_name="nomic-embed-text:latest"):
     for model in unique_models:
         try:
             print(f"Attempting to use embedding model: {model}")
-            embeddings = OllamaEmbeddings(
-                model=model,
-                base_url=base_url
-            )
+            try:
+                embeddings = OllamaEmbeddings(
+                    model=model,
+                    base_url=base_url,
+                    keep_alive=OLLAMA_KEEP_ALIVE
+                )
+            except (TypeError, ValueError):
+                # Older langchain-community versions don't accept keep_alive
+                embeddings = OllamaEmbeddings(
+                    model=model,
+                    base_url=base_url
+                )
             
             # Test the embeddings with a simple query
             test_embedding = embeddings.embed_query("test embedding")
@@ -106,11 +156,20 @@ def initialize_llm(model_name="llama3.1:latest", temperature=0.1):
     for model in unique_models:
         try:
             print(f"Attempting to use LLM model: {model}")
-            llm = Ollama(
-                model=model,
-                temperature=temperature,
-                base_url=base_url
-            )
+            try:
+                llm = Ollama(
+                    model=model,
+                    temperature=temperature,
+                    base_url=base_url,
+                    keep_alive=OLLAMA_KEEP_ALIVE
+                )
+            except (TypeError, ValueError):
+                # Older langchain-community versions don't accept keep_alive
+                llm = Ollama(
+                    model=model,
+                    temperature=temperature,
+                    base_url=base_url
+                )
             
             # Test the LLM with a simple query
             test_response = llm.invoke("Hello")
@@ -212,7 +271,7 @@ def load_vector_store(graph, embeddings, index_name):
                 self.url = url
                 self.username = username
                 self.password = password
-                self.driver = GraphDatabase.driver(url, auth=(username, password))
+                self.driver = GraphDatabase.driver(url, auth=(username, password), **NEO4J_DRIVER_CONFIG)
                 self.index_name = index_name
                 self.node_label = node_label
                 self.text_property = text_node_property
@@ -221,7 +280,12 @@ def load_vector_store(graph, embeddings, index_name):
             def similarity_search(self, query, k=3):
                 # Convert query to embedding
                 query_embedding = self.embeddings.embed_query(query)
-                
+                return self.similarity_search_by_vector(query_embedding, k=k)
+            
+            def similarity_search_by_vector(self, query_embedding, k=3):
+                return [doc for doc, _ in self.similarity_search_with_score_by_vector(query_embedding, k=k)]
+            
+            def similarity_search_with_score_by_vector(self, query_embedding, k=3):
                 # Perform vector search
                 with self.driver.session() as session:
                     search_query = f"""
@@ -237,8 +301,8 @@ def load_vector_store(graph, embeddings, index_name):
                         embedding=query_embedding
                     )
                     
-                    # Convert results to Document objects
-                    docs = []
+                    # Convert results to (Document, score) pairs
+                    docs_and_scores = []
                     for record in result:
                         node = record["node"]
                         node_props = dict(node)
@@ -252,9 +316,9 @@ def load_vector_store(graph, embeddings, index_name):
                             page_content=node_props.get(self.text_property, ""),
                             metadata=metadata
                         )
-                        docs.append(doc)
+                        docs_and_scores.append((doc, record["score"]))
                     
-                    return docs
+                    return docs_and_scores
         
         # Create our custom implementation
         vector_store = CustomNeo4jVector(
@@ -340,9 +404,22 @@ def load_vector_store(graph, embeddings, index_name):
                 
 
 
-def vector_search(vector_store, query, k=3):
-    """Perform vector search and return results."""
+def vector_search(vector_store, query, k=3, query_vector=None):
+    """
+    Perform vector search and return results.
+    If query_vector is given, it is used instead of embedding the query again,
+    and each result's similarity is stored in metadata["vector_score"] when available.
+    """
     try:
+        if query_vector is not None and hasattr(vector_store, "similarity_search_with_score_by_vector"):
+            # Keep the similarity score so callers can judge result confidence
+            docs = []
+            for doc, score in vector_store.similarity_search_with_score_by_vector(query_vector, k=k):
+                doc.metadata["vector_score"] = score
+                docs.append(doc)
+            return docs
+        if query_vector is not None and hasattr(vector_store, "similarity_search_by_vector"):
+            return vector_store.similarity_search_by_vector(query_vector, k=k)
         docs = vector_store.similarity_search(query, k=k)
         return docs
     except Exception as e:
@@ -350,9 +427,43 @@ def vector_search(vector_store, query, k=3):
         return []
 
 
-def generate_cypher_query(query, llm, graph):
-    """Generate a Cypher query from a natural language query using LLM."""
-    # Get information about the graph
+# Cypher generation prompt, parsed once at import
+CYPHER_PROMPT = PromptTemplate.from_template("""
+You are an expert Neo4j Cypher query generator. Your task is to convert a natural language query into an appropriate Cypher query.
+
+GRAPH INFORMATION:
+- Labels: {labels}
+- Relationship types: {relationship_types}
+- Total nodes: {total_nodes}
+- Total relationships: {total_relationships}
+
+USER QUERY:
+{query}
+
+When generating the Cypher query, consider:
+1. Use appropriate labels and relationship types from the provided graph information
+2. Limit results to a reasonable number (usually 20-30 nodes at most)
+3. Include useful node properties in the RETURN statement
+4. Use pattern matching to find relevant connections between entities
+5. For property searches, use case-insensitive matching when appropriate (toLower, CONTAINS, etc.)
+6. Return results in a meaningful order
+
+Return only the Cypher query without any explanations or comments. 
+""")
+
+# Upper bound on generated tokens for a Cypher query
+CYPHER_MAX_TOKENS = 200
+
+# Graph schema summaries, computed once per graph connection
+_graph_info_cache = {}
+
+
+def get_graph_info(graph):
+    """Return the labels, relationship types and counts used to prompt for Cypher."""
+    cache_key = id(graph)
+    if cache_key in _graph_info_cache:
+        return _graph_info_cache[cache_key]
+    
     try:
         # Get all labels
         label_result = graph.query("CALL db.labels() YIELD label RETURN label")
@@ -367,53 +478,38 @@ def generate_cypher_query(query, llm, graph):
         rel_count = graph.query("MATCH ()-[r]->() RETURN count(r) AS count")[0]["count"]
     except Exception as e:
         print(f"Warning: Could not get complete graph information: {e}")
-        # Fallback to empty values
-        labels = []
-        rel_types = []
-        node_count = 0
-        rel_count = 0
-    
-    # Create prompt template
-    prompt_template = """
-    You are an expert Neo4j Cypher query generator. Your task is to convert a natural language query into an appropriate Cypher query.
-
-    GRAPH INFORMATION:
-    - Labels: {labels}
-    - Relationship types: {relationship_types}
-    - Total nodes: {total_nodes}
-    - Total relationships: {total_relationships}
-
-    USER QUERY:
-    {query}
-
-    When generating the Cypher query, consider:
-    1. Use appropriate labels and relationship types from the provided graph information
-    2. Limit results to a reasonable number (usually 20-30 nodes at most)
-    3. Include useful node properties in the RETURN statement
-    4. Use pattern matching to find relevant connections between entities
-    5. For property searches, use case-insensitive matching when appropriate (toLower, CONTAINS, etc.)
-    6. Return results in a meaningful order
-
-    Return only the Cypher query without any explanations or comments. 
-    """
+        # Fallback to empty values (not cached, so the next query retries)
+        return {
+            "labels": [],
+            "relationship_types": [],
+            "total_nodes": 0,
+            "total_relationships": 0
+        }
     
-    prompt = PromptTemplate.from_template(prompt_template)
+    graph_info = {
+        "labels": labels,
+        "relationship_types": rel_types,
+        "total_nodes": node_count,
+        "total_relationships": rel_count
+    }
+    _graph_info_cache[cache_key] = graph_info
+    return graph_info
+
+
+def generate_cypher_query(query, llm, graph):
+    """Generate a Cypher query from a natural language query using LLM."""
+    # Get information about the graph
+    graph_info = get_graph_info(graph)
     
-    # Create chain
+    # Create chain, capping generation length since only a query is expected
     chain = (
-        prompt
-        | llm
+        CYPHER_PROMPT
+        | llm.bind(num_predict=CYPHER_MAX_TOKENS)
         | StrOutputParser()
     )
     
     # Generate and clean the query
-    generated_query = chain.invoke({
-        "labels": labels,
-        "relationship_types": rel_types,
-        "total_nodes": node_count,
-        "total_relationships": rel_count,
-        "query": query
-    }).strip()
+    generated_query = chain.invoke({**graph_info, "query": query}).strip()
     
     # Clean up the query by removing markdown code formatting if present
     if generated_query.startswith("```") and generated_query.endswith("```"):
@@ -430,16 +526,16 @@ def llm_graph_search(graph, query, llm, k=5):
     Perform a graph-based search using LLM-generated Cypher queries.
     This is more sophisticated than simple keyword matching.
     """
-    print(f"Generating Cypher query for: '{query}'")
+    logger.debug("Generating Cypher query for: '%s'", query)
     
     try:
         # Generate Cypher query using LLM
         cypher_query = generate_cypher_query(query, llm, graph)
-        print(f"Generated Cypher query: {cypher_query}")
+        logger.debug("Generated Cypher query: %s", cypher_query)
         
         # Execute the query
         result = graph.query(cypher_query)
-        print(f"Found {len(result)} results via LLM-powered graph search")
+        logger.debug("Found %d results via LLM-powered graph search", len(result))
         
         # Convert results to documents
         docs = []
@@ -566,71 +662,60 @@ def relationship_context(graph, docs, k=3):
     Find relationships related to the nodes in the documents.
     This adds context about how entities are connected.
     """
-    related_info = []
-    
+    # Build one lookup key per seed node; only one of id/internal_id/name is set
+    seeds = []
     for doc in docs:
         # Extract identifiers from metadata
         node_id = doc.metadata.get("id")
-        if not node_id:
-            # Try other potential identifier properties
-            node_internal_id = doc.metadata.get("internal_id")
-            node_name = doc.metadata.get("name")
-            
-            if not (node_internal_id or node_name):
-                continue
-            
-            # Build query based on available identifiers
-            where_clause = ""
-            params = {"limit": k}
-            
-            if node_internal_id:
-                where_clause = "elementId(n) = $internal_id"
-                params["internal_id"] = node_internal_id
-            elif node_name:
-                where_clause = "n.name = $name"
-                params["name"] = node_name
-            
-            # Skip if we couldn't build a query
-            if not where_clause:
+        if node_id:
+            seeds.append({"id": node_id, "internal_id": None, "name": None})
+            continue
+        
+        # Try other potential identifier properties
+        node_internal_id = doc.metadata.get("internal_id")
+        node_name = doc.metadata.get("name")
+        
+        if node_internal_id:
+            seeds.append({"id": None, "internal_id": node_internal_id, "name": None})
+        elif node_name:
+            seeds.append({"id": None, "internal_id": None, "name": node_name})
+    
+    if not seeds:
+        return []
+    
+    # Query relationships for all seeds in a single round trip, keeping the
+    # per-seed limit with a subquery
+    cypher_query = """
+    UNWIND $seeds AS seed
+    CALL {
+        WITH seed
+        MATCH (n)-[r]-(m)
+        WHERE n.id = seed.id
+           OR elementId(n) = seed.internal_id
+           OR n.name = seed.name
+        RETURN type(r) AS relationship, 
+            n.name AS source_name,
+            m.name AS target_name,
+            labels(n) AS source_labels,
+            labels(m) AS target_labels
+        LIMIT $limit
+    }
+    RETURN relationship, source_name, target_name, source_labels, target_labels
+    """
+    
+    related_info = []
+    try:
+        result = graph.query(cypher_query, params={"seeds": seeds, "limit": k})
+        
+        for item in result:
+            # Skip if we're missing essential data
+            if not (item.get('source_name') and item.get('target_name') and item.get('relationship')):
                 continue
                 
-            # Query for relationships
-            cypher_query = f"""
-            MATCH (n)-[r]-(m)
-            WHERE {where_clause}
-            RETURN type(r) AS relationship, 
-                n.name AS source_name,
-                m.name AS target_name,
-                labels(n) AS source_labels,
-                labels(m) AS target_labels
-            LIMIT $limit
-            """
-        else:
-            # We have an id, use it
-            cypher_query = """
-            MATCH (n)-[r]-(m)
-            WHERE n.id = $node_id
-            RETURN type(r) AS relationship, 
-                n.name AS source_name,
-                m.name AS target_name,
-                labels(n) AS source_labels,
-                labels(m) AS target_labels
-            LIMIT $limit
-            """
-            params = {"node_id": node_id, "limit": k}
-        
-        try:
-            result = graph.query(cypher_query, params=params)
-            
-            for item in result:
-                # Skip if we're missing essential data
-                if not (item.get('source_name') and item.get('target_name') and item.get('relationship')):
-                    continue
-                    
-                relation_info = f"{item['source_name']} [{item['relationship']}] {item['target_name']}"
-                related_info.append(relation_info)
-        except Exception as e:
-            print(f"❌ Error querying relationships: {e}")
+            relation_info = f"{item['source_name']} [{item['relationship']}] {item['target_name']}"
+            related_info.append(relation_info)
+    except Exception as e:
+        print(f"❌ Error querying relationships: {e}")
     
     # Return unique relationships
     return list(set(related_info))
@@ -683,7 +768,7 @@ def enhanced_relationship_search(graph, docs, query, llm, k=5):
             lines = cypher_query.split("\n")
             cypher_query = "\n".join(lines[1:-1])
         
-        print(f"Generated relationship query: {cypher_query}")
+        logger.debug("Generated relationship query: %s", cypher_query)
         
         # Execute the query
         result = graph.query(cypher_query)
@@ -723,97 +808,202 @@ def enhanced_relationship_search(graph, docs, query, llm, k=5):
         return []
 
 
+def _normalize_embedding(embedding):
+    """Return the embedding as an L2-normalized float32 vector."""
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def semantic_cache_lookup(query_embedding, threshold=SEMANTIC_CACHE_THRESHOLD):
+    """Return the cached payload for the most similar earlier query, or None."""
+    if not _semantic_cache:
+        return None
+    
+    # Cosine similarity against every cached query in a single matrix product
+    stacked = np.vstack([entry[0] for entry in _semantic_cache])
+    similarities = stacked @ query_embedding
+    best = int(np.argmax(similarities))
+    if similarities[best] < threshold:
+        return None
+    
+    # Mark the entry as most recently used
+    entry = _semantic_cache.pop(best)
+    _semantic_cache.append(entry)
+    return entry[1]
+
+
+def semantic_cache_store(query_embedding, payload):
+    """Add a retrieval payload to the semantic cache, evicting the LRU entry if full."""
+    _semantic_cache.append((query_embedding, payload))
+    if len(_semantic_cache) > SEMANTIC_CACHE_SIZE:
+        _semantic_cache.pop(0)
+
+
+def save_semantic_cache(cache_file):
+    """Save the semantic cache to a file."""
+    output_dir = os.path.dirname(cache_file)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    
+    with open(cache_file, 'wb') as f:
+        pickle.dump(_semantic_cache, f)
+    print(f"✓ Saved {len(_semantic_cache)} cached queries to {cache_file}")
+
+
+def load_semantic_cache(cache_file):
+    """Load a previously saved semantic cache from a file."""
+    if not os.path.exists(cache_file):
+        return
+    
+    try:
+        with open(cache_file, 'rb') as f:
+            entries = pickle.load(f)
+        _semantic_cache[:] = entries[-SEMANTIC_CACHE_SIZE:]
+        print(f"✓ Loaded {len(_semantic_cache)} cached queries from {cache_file}")
+    except Exception as e:
+        print(f"❌ Could not load semantic cache from {cache_file}: {e}")
+
+
+def get_content_fingerprint(content):
+    """Return an 8-byte digest of the first 100 characters, used to detect duplicate documents."""
+    return hashlib.blake2b(content[:100].encode("utf-8"), digest_size=8).digest()
+
+
+def get_node_label(metadata):
+    """Return the primary node label stored in document metadata, or 'Unknown'."""
+    node_labels = metadata.get("node_labels")
+    if isinstance(node_labels, list):
+        return node_labels[0] if node_labels else "Unknown"
+    if isinstance(node_labels, str):
+        return node_labels
+    return "Unknown"
+
+
 def combine_search_results(vector_results, graph_results, llm_graph_results, relationship_info):
-    """Combine results from vector and graph searches, removing duplicates."""
-    # Track seen content to avoid duplicates
-    seen_content = set()
+    """
+    Combine results from vector and graph searches, removing duplicates.
+    Documents are ranked with Reciprocal Rank Fusion across the three result lists.
+    """
+    # Map each content fingerprint to its position in combined_docs
+    positions = {}
     combined_docs = []
     
-    # Create scores to track search method priorities (for ranking)
-    scores = {}
-    
-    # Process vector results first with highest priority
-    for i, doc in enumerate(vector_results):
-        # Create a fingerprint of the content to detect duplicates
-        content_fingerprint = doc.page_content[:100]  # Use the first 100 chars as fingerprint
-        if content_fingerprint not in seen_content:
-            seen_content.add(content_fingerprint)
-            combined_docs.append(doc)
-            # Add a score based on position (higher for earlier results)
-            scores[content_fingerprint] = 100 - i  # Vector results get highest scores
-    
-    # Then add LLM-powered graph results with medium priority
-    for i, doc in enumerate(llm_graph_results):
-        content_fingerprint = doc.page_content[:100]
-        if content_fingerprint not in seen_content:
-            seen_content.add(content_fingerprint)
-            combined_docs.append(doc)
-            # Add a score based on position
-            scores[content_fingerprint] = 70 - i  # LLM graph results get medium scores
-    
-    # Then add keyword-based graph results with lowest priority
-    for i, doc in enumerate(graph_results):
-        content_fingerprint = doc.page_content[:100]
-        if content_fingerprint not in seen_content:
-            seen_content.add(content_fingerprint)
-            combined_docs.append(doc)
-            # Add a score based on position
-            scores[content_fingerprint] = 40 - i  # Basic graph results get lowest scores
-    
-    # Sort combined docs based on scores
-    sorted_docs = sorted(
-        combined_docs,
-        key=lambda doc: scores.get(doc.page_content[:100], 0),
-        reverse=True
-    )
+    # One (document position, rank) pair per retrieved document
+    doc_positions = []
+    ranks = []
+    
+    # Visit lists in priority order so ties keep vector > LLM graph > keyword graph
+    for results in (vector_results, llm_graph_results, graph_results):
+        # Positions already ranked by this list; only a document's best rank counts
+        ranked_in_list = set()
+        for rank, doc in enumerate(results):
+            # Create a fingerprint of the content to detect duplicates
+            content_fingerprint = get_content_fingerprint(doc.page_content)
+            # A single setdefault both looks up and registers the fingerprint
+            position = positions.setdefault(content_fingerprint, len(combined_docs))
+            if position == len(combined_docs):
+                # Resolve the display label once, while merging
+                doc.metadata["_label_cached"] = get_node_label(doc.metadata)
+                combined_docs.append(doc)
+            if position in ranked_in_list:
+                continue
+            ranked_in_list.add(position)
+            doc_positions.append(position)
+            ranks.append(rank)
+    
+    if not combined_docs:
+        return [], relationship_info
+    
+    # RRF scores: each list contributes 1 / (RRF_K + rank) for every document it returned
+    scores = np.zeros(len(combined_docs))
+    np.add.at(scores, np.asarray(doc_positions), 1.0 / (RRF_K + np.asarray(ranks, dtype=np.float64)))
+    
+    # Sort combined docs based on fused scores (stable, so ties keep priority order)
+    order = np.argsort(-scores, kind="stable")
+    sorted_docs = [combined_docs[i] for i in order]
     
     return sorted_docs, relationship_info
 
 
 def format_context(docs, relationship_info):
     """Format the context from documents and relationships for the prompt."""
-    context_parts = []
+    buffer = io.StringIO()
+    write = buffer.write
     
     # Add document content
     for i, doc in enumerate(docs):
         # Extract label and name for a nice header
-        label = "Unknown"
-        if "node_labels" in doc.metadata:
-            if isinstance(doc.metadata["node_labels"], list) and doc.metadata["node_labels"]:
-                label = doc.metadata["node_labels"][0]
-            elif isinstance(doc.metadata["node_labels"], str):
-                label = doc.metadata["node_labels"]
+        label = doc.metadata.get("_label_cached") or get_node_label(doc.metadata)
         
         name = doc.metadata.get("name", f"Item {i+1}")
         
         # Add a header with label and name
-        context_parts.append(f"--- {label}: {name} ---")
+        write(f"--- {label}: {name} ---\n")
         
         # Add key metadata that might be important
-        important_metadata = ["id", "type", "category", "created", "source"]
         metadata_parts = []
-        for key in important_metadata:
-            if key in doc.metadata and doc.metadata[key]:
-                metadata_parts.append(f"{key}: {doc.metadata[key]}")
+        for key in IMPORTANT_METADATA:
+            value = doc.metadata.get(key)
+            if value:
+                metadata_parts.append(f"{key}: {value}")
         
         if metadata_parts:
-            context_parts.append("Metadata: " + ", ".join(metadata_parts))
+            write("Metadata: " + ", ".join(metadata_parts) + "\n")
         
-        # Add the actual content
-        context_parts.append(doc.page_content)
-        context_parts.append("")  # Empty line for separation
+        # Add the actual content, followed by an empty line for separation
+        write(doc.page_content + "\n\n")
     
     # Add relationship information if available
     if relationship_info and len(relationship_info) > 0:
-        context_parts.append("--- Entity Relationships ---")
+        write("--- Entity Relationships ---\n")
         for rel in relationship_info:
-            context_parts.append(f"- {rel}")
+            write(f"- {rel}\n")
     
-    return "\n".join(context_parts)
+    # Every line was written with a trailing newline; drop the final one
+    return buffer.getvalue()[:-1]
+
+
+# Answer prompt for the RAG chain, parsed once at import
+RAG_PROMPT = ChatPromptTemplate.from_template("""
+You are an intelligent and knowledgeable assistant with access to information from a knowledge graph.
+Use the following context to answer the question. The context contains information about
+entities from a graph database and how they are related to each other.
+
+When answering:
+- Focus on relationships between entities when they're relevant to the question
+- Consider how different entities are connected in the graph
+- If multiple entities are mentioned, explain how they relate to each other
+- If you don't know the answer based on the provided context, say so clearly
+
+Context:
+{context}
+
+Question: {question}
+
+Answer:
+""")
+
+
+def cosine_to_vector_score(similarity):
+    """
+    Convert a cosine similarity to the score scale of a Neo4j cosine vector index,
+    which normalizes scores to (1 + cosine) / 2 so they fall between 0 and 1.
+    """
+    return (1 + similarity) / 2
 
 
-def create_enhanced_rag_chain(llm, vector_store, graph):
-    """Create an enhanced hybrid RAG chain with LLM-powered graph search."""
+def create_enhanced_rag_chain(llm, vector_store, graph, embeddings, fallback_threshold=6,
+                              high_confidence_threshold=0.9):
+    """
+    Create an enhanced hybrid RAG chain with LLM-powered graph search.
+    The keyword fallback search only runs when the vector and LLM graph searches
+    together return fewer than fallback_threshold documents. When the top vector
+    hit has a cosine similarity of at least high_confidence_threshold, only vector
+    search and basic relationship context are used.
+    """
+    # Vector index scores are on the (1 + cosine) / 2 scale
+    high_confidence_score = cosine_to_vector_score(high_confidence_threshold)
     
     # Define the hybrid retrieval function
     def enhanced_hybrid_retrieval(query_dict):
@@ -824,37 +1014,74 @@ def create_enhanced_rag_chain(llm, vector_store, graph):
             query = query_dict
         else:
             raise ValueError(f"Expected str or dict with 'query' key, got {type(query_dict)}: {query_dict}")
-            
-        # Step 1: Vector search
-        print(f"Performing vector search for: '{query}'")
-        vector_results = vector_search(vector_store, query, k=3)
-        print(f"  Found {len(vector_results)} results via vector search")
         
-        # Step 2: LLM-powered graph search
-        print(f"Performing LLM-powered graph search for: '{query}'")
-        llm_graph_results = llm_graph_search(graph, query, llm, k=3)
-        print(f"  Found {len(llm_graph_results)} results via LLM-powered graph search")
+        # Embed the query exactly once; the vector is shared by the cache and vector search
+        query_vector = embeddings.embed_query(query)
         
-        # Step 3: Basic fallback graph search (as a last resort)
-        print(f"Performing fallback graph search for: '{query}'")
-        graph_results = fallback_graph_search(graph, query, k=3)
-        print(f"  Found {len(graph_results)} results via basic graph search")
+        # Serve near-duplicate questions from the semantic cache
+        query_embedding = _normalize_embedding(query_vector)
+        cached = semantic_cache_lookup(query_embedding)
+        if cached is not None:
+            logger.debug("Using cached retrieval results for: '%s'", query)
+            return {"context": cached["context"], "question": query}
         
-        # Step 4: Get basic relationship context
-        print("Retrieving relationship context...")
-        rel_info = relationship_context(graph, vector_results + llm_graph_results, k=5)
-        print(f"  Found {len(rel_info)} basic relationships")
+        # Step 1: Vector search (a single index lookup, since the query is already embedded)
+        logger.debug("Performing vector search for: '%s'", query)
+        vector_results = vector_search(vector_store, query, k=3, query_vector=query_vector)
+        logger.debug("  Found %d results via vector search", len(vector_results))
         
-        # Step 5: Get enhanced relationship information using LLM
-        print("Retrieving enhanced relationship information...")
-        enhanced_rel_info = enhanced_relationship_search(
-            graph,
-            vector_results + llm_graph_results,
-            query,
-            llm,
-            k=3
-        )
-        print(f"  Found {len(enhanced_rel_info)} enhanced relationships")
+        # A very close vector match answers the question on its own, so the
+        # expensive LLM-driven searches can be skipped
+        top_score = vector_results[0].metadata.get("vector_score") if vector_results else None
+        high_confidence = top_score is not None and top_score >= high_confidence_score
+        
+        if high_confidence:
+            logger.debug("Top vector score %.3f >= %.3f (cosine %.2f), skipping LLM graph, fallback and enhanced relationship searches",
+                         top_score, high_confidence_score, high_confidence_threshold)
+            llm_graph_results = []
+        else:
+            # Step 2: LLM-powered graph search
+            logger.debug("Performing LLM-powered graph search for: '%s'", query)
+            llm_graph_results = llm_graph_search(graph, query, llm, k=3)
+            logger.debug("  Found %d results via LLM-powered graph search", len(llm_graph_results))
+        
+        # Steps 3-5 depend on the seed documents but not on each other
+        seed_docs = vector_results + llm_graph_results
+        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+            # Step 3: Basic fallback graph search (as a last resort), skipped when
+            # the other searches already returned enough results
+            graph_future = None
+            if not high_confidence and len(seed_docs) < fallback_threshold:
+                logger.debug("Performing fallback graph search for: '%s'", query)
+                graph_future = executor.submit(fallback_graph_search, graph, query, k=3)
+            
+            # Step 4: Get basic relationship context
+            logger.debug("Retrieving relationship context...")
+            rel_future = executor.submit(relationship_context, graph, seed_docs, k=5)
+            
+            # Step 5: Get enhanced relationship information using LLM
+            enhanced_rel_future = None
+            if not high_confidence:
+                logger.debug("Retrieving enhanced relationship information...")
+                enhanced_rel_future = executor.submit(
+                    enhanced_relationship_search,
+                    graph,
+                    seed_docs,
+                    query,
+                    llm,
+                    k=3
+                )
+            
+            graph_results = graph_future.result() if graph_future else []
+            rel_info = rel_future.result()
+            enhanced_rel_info = enhanced_rel_future.result() if enhanced_rel_future else []
+        
+        if graph_future:
+            logger.debug("  Found %d results via basic graph search", len(graph_results))
+        elif not high_confidence:
+            logger.debug("Skipped fallback graph search (%d results already found)", len(seed_docs))
+        logger.debug("  Found %d basic relationships", len(rel_info))
+        logger.debug("  Found %d enhanced relationships", len(enhanced_rel_info))
         
         # Combine all relationship information
         all_rel_info = rel_info + enhanced_rel_info
@@ -867,37 +1094,15 @@ def create_enhanced_rag_chain(llm, vector_store, graph):
         # Step 7: Format context
         context = format_context(combined_docs, relationships)
         
+        semantic_cache_store(query_embedding, {"context": context})
+        
         return {"context": context, "question": query}
     
-    # Create prompt template with additional guidance
-    prompt = ChatPromptTemplate.from_template("""
-    You are an intelligent and knowledgeable assistant with access to information from a knowledge graph.
-    Use the following context to answer the question. The context contains information about
-    entities from a graph database and how they are related to each other.
-    
-    When answering:
-    - Focus on relationships between entities when they're relevant to the question
-    - Consider how different entities are connected in the graph
-    - If multiple entities are mentioned, explain how they relate to each other
-    - If you don't know the answer based on the provided context, say so clearly
-    
-    Context:
-    {context}
-    
-    Question: {question}
-    
-    Answer:
-    """)
-    
-    # Create chain - fix the input for RunnablePassthrough
+    # Create chain - the retrieval step accepts a str or {"query": ...} and
+    # returns the prompt variables directly
     chain = (
-        {"query": RunnablePassthrough()} 
-        | RunnablePassthrough.assign(retriever_output=enhanced_hybrid_retrieval)
-        | RunnablePassthrough.assign(
-            context=lambda x: x["retriever_output"]["context"],
-            question=lambda x: x["retriever_output"]["question"],
-        )
-        | prompt
+        RunnableLambda(enhanced_hybrid_retrieval)
+        | RAG_PROMPT
         | llm
         | StrOutputParser()
     )
@@ -905,6 +1110,52 @@ def create_enhanced_rag_chain(llm, vector_store, graph):
     return chain
 
 
+def warm_up_connections(graph, embeddings):
+    """
+    Open the Neo4j and Ollama connections and load the graph schema cache so the
+    first interactive question doesn't pay the cold-start cost. No LLM generation
+    is spent on this.
+    """
+    print("Warming up...")
+    try:
+        embeddings.embed_query("warmup")
+        graph.query("RETURN 1 AS ok")
+        get_graph_info(graph)
+    except Exception as e:
+        # Warmup is best effort; the first question will surface real errors
+        logger.debug("Warmup failed: %s", e)
+
+
+def print_answer_header():
+    """Print the banner shown above an answer."""
+    print("\n" + "-"*50)
+    print("ANSWER:")
+    print("-"*50)
+
+
+def stream_answer(rag_chain, question):
+    """Print the answer as it is generated, falling back to invoke if streaming is unsupported."""
+    streamed = False
+    try:
+        for chunk in rag_chain.stream(question):
+            if not streamed:
+                print_answer_header()
+                streamed = True
+            print(chunk, end="", flush=True)
+    except NotImplementedError:
+        if streamed:
+            raise
+        # Backend does not support streaming
+        answer = rag_chain.invoke(question)
+        print_answer_header()
+        print(answer)
+        return
+    
+    if not streamed:
+        print_answer_header()
+    print()
+
+
 def main():
     parser = argparse.ArgumentParser(description="Enhanced Neo4j Hybrid RAG for Question Answering")
     parser.add_argument("--index", help="Vector index name to use")
@@ -914,6 +1165,12 @@ def main():
     parser.add_argument("--temperature", type=float, default=0.1, help="LLM temperature")
     parser.add_argument("--interactive", action="store_true", help="Run in interactive mode")
     parser.add_argument("--verbose", action="store_true", help="Enable verbose output")
+    parser.add_argument("--fallback-threshold", type=int, default=6,
+                        help="Skip the keyword fallback search when vector + LLM graph search return at least this many results")
+    parser.add_argument("--hi-conf", type=float, default=0.9,
+                        help="Cosine similarity of the top vector hit at or above which LLM graph and fallback searches are skipped "
+                             "(compared as (1 + cosine) / 2, the scale of Neo4j vector index scores; use >1 to disable)")
+    parser.add_argument("--cache-file", help="File to load/save the semantic query cache (e.g. cache/semantic_cache.pkl)")
     parser.add_argument("question", nargs="?", help="Question to answer (not needed in interactive mode)")
     
     args = parser.parse_args()
@@ -921,6 +1178,8 @@ def main():
     # Set up global verbosity
     global VERBOSE
     VERBOSE = args.verbose
+    logging.basicConfig(format="%(message)s")
+    logger.setLevel(logging.DEBUG if VERBOSE else logging.WARNING)
     
     # Initialize Neo4j connection
     graph = initialize_neo4j_connection()
@@ -972,11 +1231,23 @@ def main():
         print("❌ Failed to create vector store. Please check your Neo4j configuration.")
         return
     
+    # Warm the semantic cache from a previous session
+    if args.cache_file:
+        load_semantic_cache(args.cache_file)
+    
     # Create enhanced RAG chain
-    rag_chain = create_enhanced_rag_chain(llm, vector_store, graph)
+    rag_chain = create_enhanced_rag_chain(
+        llm, vector_store, graph, embeddings,
+        fallback_threshold=args.fallback_threshold,
+        high_confidence_threshold=args.hi_conf
+    )
     
     # Interactive mode or single question
     if args.interactive:
+        # The chain and driver pool are built once above and reused
+        # for every question; warm them before the first prompt
+        warm_up_connections(graph, embeddings)
+        
         print("\n" + "="*50)
         print("INTERACTIVE QUESTION ANSWERING")
         print("Type 'exit' or 'quit' to end the session")
@@ -992,11 +1263,7 @@ def main():
             
             print("\nProcessing...")
             try:
-                answer = rag_chain.invoke(question)
-                print("\n" + "-"*50)
-                print("ANSWER:")
-                print("-"*50)
-                print(answer)
+                stream_answer(rag_chain, question)
             except Exception as e:
                 print(f"❌ Error: {e}")
                 if args.verbose:
@@ -1007,9 +1274,7 @@ def main():
     elif args.question:
         try:
             answer = rag_chain.invoke(args.question)
-            print("\n" + "-"*50)
-            print("ANSWER:")
-            print("-"*50)
+            print_answer_header()
             print(answer)
         except Exception as e:
             print(f"❌ Error: {e}")
@@ -1020,6 +1285,9 @@ def main():
     else:
         print("❌ No question provided. Use --interactive or provide a question.")
         print("You can also use --help to see all available options.")
+    
+    if args.cache_file:
+        save_semantic_cache(args.cache_file)
 
 
 if __name__ == "__main__":
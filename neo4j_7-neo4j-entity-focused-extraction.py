@@ -1,21 +1,36 @@
 # neo4j_entity_focused_extraction.py
+from __future__ import annotations
+
 import os
+import sys
 import argparse
 from dotenv import load_dotenv
 import warnings
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, TYPE_CHECKING
 import time
 import json
 import pickle
+import bisect
+import re
+import functools
+from collections import Counter
+import concurrent.futures
+import hashlib  # For LLM response cache keys
+import threading
 from pathlib import Path
 
-# LangChain imports
-from langchain_community.graphs import Neo4jGraph
-from langchain_community.llms import Ollama
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain.schema import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+# LangChain is imported inside the functions that use it, so --help and argument
+# errors do not pay for loading it; these imports are for type annotations only
+if TYPE_CHECKING:
+    from langchain_community.graphs import Neo4jGraph
+    from langchain_community.llms import Ollama
+    from langchain.schema import Document
+
+# Optional faster JSON encoder/decoder; the standard library is used when absent
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Load environment variables from .env file
 load_dotenv()
@@ -24,8 +39,41 @@ warnings.filterwarnings("ignore")
 # Global verbose flag
 VERBOSE = False
 
+# Characters that are not valid in an unquoted Neo4j label or relationship type.
+# \W is the complement of str.isalnum() plus underscore.
+INVALID_IDENTIFIER_CHARS = re.compile(r"\W")
+
+# File names listed as documents (checked before the is_file test, which may need a stat)
+DOCUMENT_FILE_PATTERN = re.compile(r"\.(?:txt|pdf|md)$", re.IGNORECASE)
+
+# Marks an extraction response in which the LLM reports the entity as absent
+NOT_FOUND_PATTERN = re.compile(r'"not_found"\s*:\s*true')
+
+# Fulltext index over the text of document/chunk nodes, used for keyword lookups
+TEXT_FULLTEXT_INDEX = "chunk_text_ft"
+TEXT_NODE_LABELS = ["Chunk", "Document"]
+
+# Number of entities shown per page when selecting an entity interactively
+ENTITY_PAGE_SIZE = 20
+
+# Length of the description excerpt shown when listing entities
+LISTING_DESCRIPTION_CHARS = 100
+
+# Number of entity types (largest first) whose first page is prefetched while
+# the user picks a type in interactive mode
+PREFETCH_ENTITY_TYPES = 5
+
+# Directory for cached LLM extraction responses (None disables the cache)
+LLM_CACHE_DIR = "llm_cache"
+
+# Seconds an LLM extraction call may run before it is abandoned. It also bounds how long
+# the Ollama client waits for the next part of a response, so a silent hang fails too.
+EXTRACTION_TIMEOUT = 900
+
 def initialize_neo4j_connection() -> Neo4jGraph:
     """Initialize and return a Neo4j graph connection."""
+    from langchain_community.graphs import Neo4jGraph
+    
     try:
         graph = Neo4jGraph(
             url=("bolt://localhost:7687"),
@@ -35,14 +83,32 @@ def initialize_neo4j_connection() -> Neo4jGraph:
         # Test connection
         graph.query("RETURN 1 as test")
         print("✓ Successfully connected to Neo4j")
+        ensure_text_fulltext_index(graph)
         return graph
     except Exception as e:
         print(f"❌ Failed to connect to Neo4j: {e}")
         print("  Please check your credentials and database availability.")
         raise e
 
+def ensure_text_fulltext_index(graph: Neo4jGraph):
+    """Create the fulltext index used for keyword lookups of document text, if missing."""
+    try:
+        graph.query(f"""
+        CREATE FULLTEXT INDEX {TEXT_FULLTEXT_INDEX} IF NOT EXISTS
+        FOR (d:{"|".join(TEXT_NODE_LABELS)}) ON EACH [d.text]
+        """)
+    except Exception as e:
+        # Keyword lookups fall back to a CONTAINS scan without the index
+        print(f"Note: Could not create fulltext index {TEXT_FULLTEXT_INDEX}: {e}")
+
+def escape_lucene_phrase(text: str) -> str:
+    """Quote text as a Lucene phrase so query syntax characters are matched literally."""
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
 def initialize_llm(model_name: str = "llama3.1:latest", temperature: float = 0.1) -> Ollama:
     """Initialize and return the LLM."""
+    from langchain_community.llms import Ollama
+    
     # List of models to try in order of preference
     models_to_try = [
         model_name,        # Try the specified model first
@@ -67,7 +133,8 @@ def initialize_llm(model_name: str = "llama3.1:latest", temperature: float = 0.1
             llm = Ollama(
                 model=model,
                 temperature=temperature,
-                base_url=base_url
+                base_url=base_url,
+                timeout=EXTRACTION_TIMEOUT
             )
             
             # Test the LLM with a simple query
@@ -81,66 +148,238 @@ def initialize_llm(model_name: str = "llama3.1:latest", temperature: float = 0.1
     # If we get here, all models failed
     raise ValueError(f"All LLM models failed. Last error: {last_exception}")
 
+@functools.lru_cache(maxsize=1)
+def get_llm(model_name: str, temperature: float) -> Ollama:
+    """Return the LLM for these settings, initializing it only on first use."""
+    return initialize_llm(model_name=model_name, temperature=temperature)
+
+def get_llm_or_report(model_name: str, temperature: float) -> Optional[Ollama]:
+    """Return the LLM, or print why it could not be initialized and return None."""
+    try:
+        return get_llm(model_name, temperature)
+    except Exception as e:
+        print(f"\nCould not initialize LLM: {e}")
+        print("Please ensure Ollama is running and the model is available.")
+        return None
+
+def quote_label(label: str) -> str:
+    """Backtick-quote a node label so any label name is safe to embed in Cypher."""
+    return "`" + label.replace("`", "``") + "`"
+
+@functools.lru_cache(maxsize=1)
+def fetch_entity_types(graph: Neo4jGraph) -> Tuple[str, ...]:
+    """
+    Query the entity types (node labels) of the graph. The result is cached per
+    connection; call fetch_entity_types.cache_clear() after writes that may add labels.
+    """
+    # Query to get all labels in the graph
+    result = graph.query("CALL db.labels() YIELD label RETURN label")
+    labels = [record["label"] for record in result]
+    
+    # Filter out system labels or labels you want to exclude
+    excluded_labels = ["Document", "Chunk", "Source", "File"]
+    return tuple(label for label in labels if label not in excluded_labels)
+
 def get_entity_types(graph: Neo4jGraph) -> List[str]:
     """Get all entity types (node labels) from the Neo4j graph."""
     try:
-        # Query to get all labels in the graph
-        result = graph.query("CALL db.labels() YIELD label RETURN label")
-        labels = [record["label"] for record in result]
-        
-        # Filter out system labels or labels you want to exclude
-        excluded_labels = ["Document", "Chunk", "Source", "File"]
-        entity_types = [label for label in labels if label not in excluded_labels]
-        
-        return entity_types
+        return list(fetch_entity_types(graph))
     except Exception as e:
         print(f"❌ Error getting entity types: {e}")
         return []
 
-def get_entities_by_type(graph: Neo4jGraph, entity_type: str, limit: int = 100) -> List[Dict[str, Any]]:
-    """Get entities of a specific type from the graph."""
+def get_entity_type_counts(graph: Neo4jGraph, entity_types: List[str]) -> Dict[str, int]:
+    """
+    Count the entities of each type in one round trip. The counts are read from
+    Neo4j's counts store when APOC is available; otherwise one query returns a
+    map of every label's count.
+    """
+    if not entity_types:
+        return {}
+    
     try:
-        # Query to get entities of the specified type with their properties
-        query = f"""
-        MATCH (e:{entity_type})
-        RETURN e.id as id, e.name as name, e.description as description, 
-               e.text as text, e.type as type, e
-        LIMIT {limit}
+        label_counts = graph.query("CALL apoc.meta.stats() YIELD labels RETURN labels")[0]["labels"]
+        return {entity_type: label_counts.get(entity_type, 0) for entity_type in entity_types}
+    except Exception as e:
+        if VERBOSE:
+            print(f"APOC label statistics unavailable, counting with a single query: {e}")
+    
+    # Labels cannot be parameters, so each one is quoted into the query. The
+    # server aggregates every count into a single map keyed by label.
+    count_query = "RETURN {" + ", ".join(
+        f"{quote_label(entity_type)}: COUNT {{ (:{quote_label(entity_type)}) }}"
+        for entity_type in entity_types
+    ) + "} as counts"
+    
+    try:
+        label_counts = graph.query(count_query)[0]["counts"]
+    except Exception as e:
+        print(f"❌ Error counting entities by type: {e}")
+        label_counts = {}
+    
+    return {entity_type: label_counts.get(entity_type, 0) for entity_type in entity_types}
+
+def entity_type_query(entity_type: str, description_chars: Optional[int] = None) -> str:
+    """
+    Build the query that returns entities of one type with their properties. With
+    description_chars set, only the ID, name and the start of the description are
+    returned, which is all a listing needs.
+    """
+    # The label stays in the query text so Neo4j can use its label scan;
+    # offset and limit are parameters so there is one cached plan per label.
+    if description_chars is not None:
+        return f"""
+        MATCH (e:{quote_label(entity_type)})
+        RETURN e.id as id, e.name as name, left(e.description, $description_chars) as description
+        SKIP $offset
+        LIMIT $limit
         """
-        
-        result = graph.query(query)
-        
-        # Process the results to get a simpler format
-        entities = []
-        for record in result:
-            # Extract node properties
-            node_props = record["e"]
-            
-            # Create entity record with common fields
-            entity = {
-                "id": record["id"],
-                "name": record["name"],
-                "type": entity_type,
-                "description": record["description"] if record["description"] else None,
-                "attributes": {}
-            }
-            
-            # Add all other properties as attributes
-            for key, value in node_props.items():
-                if key not in ["id", "name", "type", "description"] and value is not None:
-                    entity["attributes"][key] = value
-            
-            entities.append(entity)
-        
-        return entities
+    
+    return f"""
+    MATCH (e:{quote_label(entity_type)})
+    RETURN e.id as id, e.name as name, e.description as description, 
+           e.text as text, e.type as type, e
+    SKIP $offset
+    LIMIT $limit
+    """
+
+def entity_from_record(record, entity_type: str) -> Dict[str, Any]:
+    """Convert an entity_type_query record into a simpler entity dict."""
+    # Extract node properties (not returned for listings)
+    node_props = record.get("e") or {}
+    
+    # Create entity record with common fields
+    entity = {
+        "id": record["id"],
+        "name": record["name"],
+        "type": entity_type,
+        "description": record["description"] if record["description"] else None,
+        "attributes": {}
+    }
+    
+    # Add all other properties as attributes
+    for key, value in node_props.items():
+        if key not in ["id", "name", "type", "description"] and value is not None:
+            entity["attributes"][key] = value
+    
+    return entity
+
+def get_entities_by_type(
+    graph: Neo4jGraph, 
+    entity_type: str, 
+    limit: int = 100,
+    offset: int = 0,
+    description_chars: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Get entities of a specific type from the graph, skipping the first offset entities.
+    With description_chars set, descriptions are truncated server-side and no other
+    attributes are returned.
+    """
+    try:
+        result = graph.query(
+            entity_type_query(entity_type, description_chars),
+            params={"limit": limit, "offset": offset, "description_chars": description_chars}
+        )
+        return [entity_from_record(record, entity_type) for record in result]
     except Exception as e:
         print(f"❌ Error getting entities of type {entity_type}: {e}")
         return []
 
-def get_related_documents(
+def stream_entities_by_type(
+    graph: Neo4jGraph, 
+    entity_type: str, 
+    limit: int = 100,
+    description_chars: Optional[int] = None
+):
+    """
+    Yield entities of a specific type as the rows arrive from Neo4j, so a listing
+    can start printing before the whole result has been received.
+    """
+    try:
+        with graph._driver.session(database=graph._database) as session:
+            query = entity_type_query(entity_type, description_chars)
+            params = {"limit": limit, "offset": 0, "description_chars": description_chars}
+            for record in session.run(query, params):
+                yield entity_from_record(record, entity_type)
+    except Exception as e:
+        print(f"❌ Error getting entities of type {entity_type}: {e}")
+
+def get_entity_record(graph: Neo4jGraph, entity_id: str) -> Optional[Dict[str, Any]]:
+    """Look up the entity with the given ID, returning None if it does not exist."""
+    entity_query = """
+    MATCH (e {id: $entity_id})
+    RETURN e.id as id, e.name as name, e.description as description, 
+           e.type as type, labels(e) as labels
+    """
+    
+    entity_result = graph.query(entity_query, params={"entity_id": entity_id})
+    return entity_result[0] if entity_result else None
+
+def query_related_paths(graph: Neo4jGraph, entity_id: str, distance: int = 2) -> List[Dict[str, Any]]:
+    """
+    Run the path query behind get_related_documents. Every row also carries the
+    entity's own fields, and there is one row with no text if nothing is related.
+    """
+    # Query to find related document nodes or chunks
+    # This assumes a specific graph structure - adjust as needed for your graph
+    query = f"""
+    MATCH (e {{id: $entity_id}})
+    OPTIONAL MATCH path = (e)-[*1..{distance}]-(d)
+    WHERE d.text IS NOT NULL AND d.text <> ""
+    // One row per node even when several paths reach it
+    WITH d, e, collect([rel in relationships(path) | type(rel)])[0] AS rel_types
+    RETURN d.id as id, d.text as text, 
+           labels(d) as labels, d.name as name,
+           e.id as entity_id, e.name as entity_name,
+           e.description as entity_description, e.type as entity_type,
+           labels(e) as entity_labels,
+           rel_types
+    """
+    
+    return graph.query(query, params={"entity_id": entity_id})
+
+def fetch_entity_and_chunks(
     graph: Neo4jGraph, 
     entity_id: str,
     distance: int = 2
+) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Look up an entity and its related document chunks with a single path query.
+    
+    Args:
+        graph: Neo4j graph connection
+        entity_id: ID of the entity of interest
+        distance: Max path length to consider for relationships
+    
+    Returns:
+        The entity in get_entity_record format (None if it does not exist) and
+        the related document chunks
+    """
+    try:
+        result = query_related_paths(graph, entity_id, distance)
+    except Exception as e:
+        print(f"❌ Error getting related documents: {e}")
+        return get_entity_record(graph, entity_id), []
+    
+    if not result:
+        return None, []
+    
+    record = result[0]
+    entity_record = {
+        "id": record["entity_id"],
+        "name": record["entity_name"],
+        "description": record["entity_description"],
+        "type": record["entity_type"],
+        "labels": record["entity_labels"]
+    }
+    return entity_record, get_related_documents(graph, entity_id, distance, path_result=result)
+
+def get_related_documents(
+    graph: Neo4jGraph, 
+    entity_id: str,
+    distance: int = 2,
+    path_result: Optional[List[Dict[str, Any]]] = None
 ) -> List[Dict[str, Any]]:
     """
     Find documents or text chunks in the graph related to the entity of interest.
@@ -149,25 +388,15 @@ def get_related_documents(
         graph: Neo4j graph connection
         entity_id: ID of the entity of interest
         distance: Max path length to consider for relationships
+        path_result: Rows of query_related_paths, if the caller already ran it
     
     Returns:
         List of document chunks related to the entity
     """
     try:
-        # Query to find related document nodes or chunks
-        # This assumes a specific graph structure - adjust as needed for your graph
-        query = f"""
-        MATCH (e {{id: $entity_id}})
-        OPTIONAL MATCH path = (e)-[*1..{distance}]-(d)
-        WHERE d.text IS NOT NULL AND d.text <> ""
-        WITH d, e, [rel in relationships(path) | type(rel)] AS rel_types
-        RETURN d.id as id, d.text as text, 
-               labels(d) as labels, d.name as name,
-               e.id as entity_id, e.name as entity_name,
-               rel_types
-        """
-        
-        result = graph.query(query, params={"entity_id": entity_id})
+        if path_result is None:
+            path_result = query_related_paths(graph, entity_id, distance)
+        result = path_result
         
         # Process the results
         document_chunks = []
@@ -190,30 +419,48 @@ def get_related_documents(
         if not document_chunks:
             print("No directly related document chunks found. Trying keyword search...")
             
-            # Get the entity name first
-            entity_query = """
-            MATCH (e {id: $entity_id})
-            RETURN e.name as name
-            """
-            entity_result = graph.query(entity_query, params={"entity_id": entity_id})
-            entity_name = entity_result[0]["name"] if entity_result else None
+            # The path query returns a row carrying the entity name even when no
+            # document matched, so no separate lookup of the name is needed
+            entity_name = result[0]["entity_name"] if result else None
             
             if entity_name:
-                # Find document chunks containing the entity name
-                keyword_query = """
-                MATCH (d)
-                WHERE d.text IS NOT NULL AND d.text CONTAINS $keyword
+                # Find document chunks containing the entity name via the fulltext index
+                keyword_params = {"entity_id": entity_id, "entity_name": entity_name}
+                fulltext_query = f"""
+                CALL db.index.fulltext.queryNodes('{TEXT_FULLTEXT_INDEX}', $search)
+                YIELD node AS d, score
                 RETURN d.id as id, d.text as text, 
                        labels(d) as labels, d.name as name,
                        $entity_id as entity_id, $entity_name as entity_name,
                        [] as rel_types
                 LIMIT 20
                 """
+                try:
+                    keyword_result = graph.query(
+                        fulltext_query,
+                        params={**keyword_params, "search": escape_lucene_phrase(entity_name)}
+                    )
+                except Exception as e:
+                    if VERBOSE:
+                        print(f"Fulltext lookup failed, scanning text instead: {e}")
+                    keyword_result = []
                 
-                keyword_result = graph.query(
-                    keyword_query, 
-                    params={"keyword": entity_name, "entity_id": entity_id, "entity_name": entity_name}
-                )
+                # Text on nodes outside the indexed labels needs a full scan
+                if not keyword_result:
+                    keyword_query = """
+                    MATCH (d)
+                    WHERE d.text IS NOT NULL AND d.text CONTAINS $keyword
+                    RETURN d.id as id, d.text as text, 
+                           labels(d) as labels, d.name as name,
+                           $entity_id as entity_id, $entity_name as entity_name,
+                           [] as rel_types
+                    LIMIT 20
+                    """
+                    
+                    keyword_result = graph.query(
+                        keyword_query, 
+                        params={**keyword_params, "keyword": entity_name}
+                    )
                 
                 # Process the results
                 for record in keyword_result:
@@ -231,13 +478,28 @@ def get_related_documents(
                         "match_type": "keyword"
                     })
         
-        return document_chunks
+        # Different nodes can still carry the same text; each copy would cost
+        # another LLM call, so keep only the first chunk per distinct text
+        seen_texts = set()
+        unique_chunks = []
+        for chunk in document_chunks:
+            text_hash = hashlib.sha1(chunk["text"].encode("utf-8")).digest()
+            if text_hash not in seen_texts:
+                seen_texts.add(text_hash)
+                unique_chunks.append(chunk)
+        
+        if VERBOSE and len(unique_chunks) < len(document_chunks):
+            print(f"Removed {len(document_chunks) - len(unique_chunks)} duplicate document chunks")
+        
+        return unique_chunks
     except Exception as e:
         print(f"❌ Error getting related documents: {e}")
         return []
 
 def load_document(document_path: str) -> List[Document]:
     """Load document from file and return as LangChain documents."""
+    from langchain.schema import Document
+    
     try:
         # Simple text loader
         with open(document_path, 'r', encoding='utf-8') as f:
@@ -252,9 +514,12 @@ def load_document(document_path: str) -> List[Document]:
 
 def split_document(document: Document, chunk_size: int = 1000, chunk_overlap: int = 100) -> List[Document]:
     """Split document into manageable chunks for processing."""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap
+        chunk_overlap=chunk_overlap,
+        add_start_index=True  # Record each chunk's offset in the source text
     )
     return text_splitter.split_documents([document])
 
@@ -287,11 +552,37 @@ def find_entity_in_document(
     chunks = split_document(documents[0], chunk_size, chunk_overlap)
     print(f"Split document into {len(chunks)} chunks")
     
+    # Locate every mention in a single scan of the whole document, then map
+    # the mentions onto chunks by offset instead of rescanning each chunk
+    full_text = documents[0].page_content
+    full_lower = full_text.lower()
+    name_lower = entity_name.lower()
+    
+    mention_offsets = []
+    position = full_lower.find(name_lower)
+    while position != -1:
+        mention_offsets.append(position)
+        position = full_lower.find(name_lower, position + 1)
+    
+    # Lowercasing can change the length of some non-ASCII text, which would
+    # shift offsets; fall back to checking chunk text directly in that case
+    offsets_usable = len(full_lower) == len(full_text)
+    
     # Find chunks mentioning the entity
     entity_chunks = []
     for i, chunk in enumerate(chunks):
-        # Simple check if the entity name appears in the chunk
-        if entity_name.lower() in chunk.page_content.lower():
+        start = chunk.metadata.get("start_index", -1)
+        if offsets_usable and start >= 0:
+            # Any mention that starts inside the chunk and ends before its end
+            first = bisect.bisect_left(mention_offsets, start)
+            mentioned = (
+                first < len(mention_offsets)
+                and mention_offsets[first] + len(name_lower) <= start + len(chunk.page_content)
+            )
+        else:
+            mentioned = name_lower in chunk.page_content.lower()
+        
+        if mentioned:
             # Add metadata for identification
             chunk.metadata["chunk_index"] = i
             chunk.metadata["entity_name"] = entity_name
@@ -301,26 +592,41 @@ def find_entity_in_document(
     print(f"Found {len(entity_chunks)} chunks mentioning '{entity_name}'")
     return entity_chunks
 
-def extract_focused_entity_info(
-    text: str, 
-    entity_name: str, 
-    entity_type: str,
-    llm: Ollama
-) -> Dict[str, Any]:
-    """
-    Extract focused information about the entity from text.
-    
-    Args:
-        text: Text to analyze
-        entity_name: Name of the entity to focus on
-        entity_type: Type/category of the entity
-        llm: Language model for extraction
-    
-    Returns:
-        Dictionary with extracted entity information
-    """
-    # Create a focused extraction prompt
-    prompt_template = """
+def get_llm_cache_key(prompt_template: str, llm: Ollama, **inputs: str) -> str:
+    """Build a cache key from the prompt template, model settings and prompt inputs."""
+    hasher = hashlib.sha256()
+    hasher.update(prompt_template.encode("utf-8"))
+    hasher.update(f"{getattr(llm, 'model', '')}|{getattr(llm, 'temperature', '')}".encode("utf-8"))
+    for name in sorted(inputs):
+        hasher.update(f"\0{name}\0".encode("utf-8"))
+        hasher.update(inputs[name].encode("utf-8"))
+    return hasher.hexdigest()
+
+def load_cached_llm_response(cache_key: str) -> Optional[str]:
+    """Return a cached LLM response, or None if caching is disabled or there is no entry."""
+    if not LLM_CACHE_DIR:
+        return None
+    cache_path = os.path.join(LLM_CACHE_DIR, f"{cache_key}.txt")
+    if not os.path.exists(cache_path):
+        return None
+    with open(cache_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def save_cached_llm_response(cache_key: str, response: str):
+    """Store an LLM response in the on-disk cache."""
+    if not LLM_CACHE_DIR:
+        return
+    Path(LLM_CACHE_DIR).mkdir(parents=True, exist_ok=True)
+    cache_path = os.path.join(LLM_CACHE_DIR, f"{cache_key}.txt")
+    
+    # Write to a temporary file first so concurrent readers never see a partial entry
+    tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(response)
+    os.replace(tmp_path, cache_path)
+
+# Focused extraction prompt
+EXTRACTION_PROMPT_TEMPLATE = """
     You are a specialized graph entity analysis AI focused on extracting detailed information about a specific entity.
 
     -Goal-
@@ -378,28 +684,116 @@ def extract_focused_entity_info(
     
     Return ONLY valid, parseable JSON.
     """
+
+@functools.lru_cache(maxsize=1)
+def get_extraction_prompt():
+    """Parse the extraction prompt template once, on first use."""
+    from langchain_core.prompts import PromptTemplate
+    return PromptTemplate.from_template(EXTRACTION_PROMPT_TEMPLATE)
+
+# Extraction chains per LLM instance, keyed by id(llm)
+_extraction_chains = {}
+
+def get_extraction_chain(llm: Ollama):
+    """Return the extraction chain for this LLM, composing it only on first use."""
+    from langchain_core.output_parsers import StrOutputParser
+    
+    chain = _extraction_chains.get(id(llm))
+    if chain is None:
+        chain = get_extraction_prompt() | llm | StrOutputParser()
+        _extraction_chains[id(llm)] = chain
+    return chain
+
+def parse_json(json_str: str) -> Any:
+    """Parse a JSON string with orjson when available. Raises json.JSONDecodeError on bad input."""
+    if orjson is not None:
+        # orjson.JSONDecodeError is a subclass of json.JSONDecodeError
+        return orjson.loads(json_str)
+    return json.loads(json_str)
+
+def stream_extraction_response(
+    extraction_chain,
+    inputs: Dict[str, str],
+    timeout: Optional[float] = None
+) -> str:
+    """
+    Stream the extraction response, stopping as soon as the LLM reports the entity
+    as not found. In that case a complete not-found JSON object is returned in
+    place of the partial response. Raises TimeoutError once the response has been
+    streaming for longer than timeout seconds.
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    parts = []
+    tail = ""
+    stream = extraction_chain.stream(inputs)
+    try:
+        for token in stream:
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"Extraction timed out after {timeout} seconds")
+            parts.append(token)
+            # Search the new token plus enough preceding text to catch a split match
+            tail = tail[-32:] + token
+            if NOT_FOUND_PATTERN.search(tail):
+                return json.dumps({
+                    "entity_id": f"{inputs['entity_name']}_id",
+                    "name": inputs["entity_name"],
+                    "type": inputs["entity_type"],
+                    "confidence": 0.0,
+                    "not_found": True
+                })
+    finally:
+        # Closing the generator drops the connection so Ollama stops generating
+        stream.close()
+    
+    return "".join(parts)
+
+def extract_focused_entity_info(
+    text: str, 
+    entity_name: str, 
+    entity_type: str,
+    llm: Ollama
+) -> Dict[str, Any]:
+    """
+    Extract focused information about the entity from text.
+    
+    Args:
+        text: Text to analyze
+        entity_name: Name of the entity to focus on
+        entity_type: Type/category of the entity
+        llm: Language model for extraction
     
-    prompt = PromptTemplate.from_template(prompt_template)
+    Returns:
+        Dictionary with extracted entity information
+    """
+    extraction_chain = get_extraction_chain(llm)
     
-    # Create LLM chain
-    extraction_chain = prompt | llm | StrOutputParser()
+    # Reuse a previous response for the same prompt, model and chunk if available
+    cache_key = get_llm_cache_key(
+        EXTRACTION_PROMPT_TEMPLATE, llm,
+        entity_name=entity_name, entity_type=entity_type, text=text
+    )
     
     # Invoke the chain
     try:
         try:
-            # Add timeout to prevent hanging
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(extraction_chain.invoke, {
+            result_text = load_cached_llm_response(cache_key)
+            if result_text is None:
+                # Add timeout to prevent hanging. The call runs in the caller's thread,
+                # so the clock only covers the LLM call itself
+                result_text = stream_extraction_response(extraction_chain, {
                     "entity_name": entity_name,
                     "entity_type": entity_type,
                     "text": text
-                })
-                result_text = future.result(timeout=900)  # 15-minute timeout
-        except concurrent.futures.TimeoutError:
-            print(f"❌ Extraction timed out after 900 seconds")
+                }, timeout=EXTRACTION_TIMEOUT)
+                from_cache = False
+            else:
+                from_cache = True
+                if VERBOSE:
+                    print("  Using cached LLM response")
+        except TimeoutError:
+            print(f"❌ Extraction timed out after {EXTRACTION_TIMEOUT} seconds")
             return {
-                "entity_id": f"{entity_name.lower().replace(' ', '_')}_id",
+                "entity_id": entity_id_for_name(entity_name),
                 "name": entity_name,
                 "type": entity_type,
                 "error": "Extraction timed out"
@@ -413,7 +807,11 @@ def extract_focused_entity_info(
             json_str = result_text[json_start:json_end]
             try:
                 # Parse the extracted JSON
-                entity_data = json.loads(json_str)
+                entity_data = parse_json(json_str)
+                
+                # Only cache responses that parsed, so bad generations are retried next run
+                if not from_cache:
+                    save_cached_llm_response(cache_key, result_text)
                 
                 # Ensure we have the minimum required fields
                 if "name" not in entity_data:
@@ -421,7 +819,7 @@ def extract_focused_entity_info(
                 if "type" not in entity_data:
                     entity_data["type"] = entity_type
                 if "entity_id" not in entity_data:
-                    entity_data["entity_id"] = f"{entity_name.lower().replace(' ', '_')}_id"
+                    entity_data["entity_id"] = entity_id_for_name(entity_name)
                 
                 return entity_data
             except json.JSONDecodeError as e:
@@ -429,7 +827,7 @@ def extract_focused_entity_info(
                 print("Response was:", json_str)
                 # Return basic entity info
                 return {
-                    "entity_id": f"{entity_name.lower().replace(' ', '_')}_id",
+                    "entity_id": entity_id_for_name(entity_name),
                     "name": entity_name,
                     "type": entity_type,
                     "error": f"JSON parsing error: {e}",
@@ -438,7 +836,7 @@ def extract_focused_entity_info(
         else:
             print("❌ No valid JSON found in LLM response")
             return {
-                "entity_id": f"{entity_name.lower().replace(' ', '_')}_id",
+                "entity_id": entity_id_for_name(entity_name),
                 "name": entity_name,
                 "type": entity_type,
                 "error": "No JSON found in response",
@@ -447,12 +845,76 @@ def extract_focused_entity_info(
     except Exception as e:
         print(f"❌ Error during entity extraction: {e}")
         return {
-            "entity_id": f"{entity_name.lower().replace(' ', '_')}_id",
+            "entity_id": entity_id_for_name(entity_name),
             "name": entity_name,
             "type": entity_type,
             "error": f"Extraction error: {e}"
         }
 
+@functools.lru_cache(maxsize=1024)
+def sanitize_identifier(name: str) -> str:
+    """Replace characters that are not letters, digits or underscores with underscores."""
+    return INVALID_IDENTIFIER_CHARS.sub("_", name)
+
+@functools.lru_cache(maxsize=4096)
+def entity_id_for_name(name: str) -> str:
+    """Build the node ID used for an entity with the given name."""
+    return f"{name.lower().replace(' ', '_')}_id"
+
+def run_write_transaction(graph: Neo4jGraph, work, *args):
+    """
+    Run work(tx, *args) in a single write transaction on the driver already pooled
+    by the Neo4jGraph connection, so all its statements share one session and
+    commit or roll back together.
+    """
+    with graph._driver.session(database=graph._database) as session:
+        return session.execute_write(work, *args)
+
+def write_entity_relationships(tx, source_id: str, relationship_rows: List[Dict[str, Any]], use_apoc: bool = True):
+    """
+    Create target entities and relationships from the source entity in batched queries.
+    
+    Args:
+        tx: Open Neo4j transaction
+        source_id: ID of the entity the relationships start from
+        relationship_rows: Dicts with target_id, target_name, rel_type and properties
+        use_apoc: Merge every relationship type in one APOC query instead of one query per type
+    """
+    if use_apoc:
+        # Create or merge the target entities, then the relationships. APOC lets the
+        # relationship type be a parameter, so every type shares one query.
+        apoc_query = """
+        UNWIND $rows AS row
+        MERGE (t:Entity {id: row.target_id})
+        ON CREATE SET t.name = row.target_name
+        WITH row
+        MATCH (source {id: $source_id})
+        MATCH (target {id: row.target_id})
+        CALL apoc.merge.relationship(source, row.rel_type, {}, row.properties, target, row.properties)
+        YIELD rel
+        RETURN count(rel) AS count
+        """
+        tx.run(apoc_query, {"source_id": source_id, "rows": relationship_rows}).consume()
+        return
+    
+    # Without APOC the type must be part of the query text, so batch per type
+    rows_by_type = {}
+    for row in relationship_rows:
+        rows_by_type.setdefault(row["rel_type"], []).append(row)
+    
+    for rel_type, rows in rows_by_type.items():
+        rel_query = f"""
+        UNWIND $rows AS row
+        MERGE (t:Entity {{id: row.target_id}})
+        ON CREATE SET t.name = row.target_name
+        WITH row
+        MATCH (source {{id: $source_id}})
+        MATCH (target {{id: row.target_id}})
+        MERGE (source)-[r:{rel_type}]->(target)
+        SET r += row.properties
+        """
+        tx.run(rel_query, {"source_id": source_id, "rows": rows}).consume()
+
 def update_entity_in_graph(graph: Neo4jGraph, entity_data: Dict[str, Any], entity_id: str = None) -> str:
     """
     Update or create an entity in the Neo4j graph with enhanced information.
@@ -476,7 +938,7 @@ def update_entity_in_graph(graph: Neo4jGraph, entity_data: Dict[str, Any], entit
         target_id = entity_id
     else:
         # Use ID from data or generate one
-        target_id = entity_data.get("entity_id", f"{name.lower().replace(' ', '_')}_id")
+        target_id = entity_data.get("entity_id", entity_id_for_name(name))
     
     # Extract properties, handling potential missing fields
     properties = entity_data.get("properties", {})
@@ -494,73 +956,63 @@ def update_entity_in_graph(graph: Neo4jGraph, entity_data: Dict[str, Any], entit
             entity_properties[key] = value
     
     # Ensure the entity type is valid for Neo4j (no spaces or special chars)
-    entity_type = "".join(c if c.isalnum() else "_" for c in entity_type)
-    
-    try:
-        # Update or create entity node
-        query = f"""
-        MERGE (e:{entity_type} {{id: $id}})
-        SET e += $properties
-        RETURN e.id as id
-        """
+    entity_type = sanitize_identifier(entity_type)
+    
+    # Collect relationships so they can be written in batched queries
+    relationship_rows = []
+    for rel in entity_data.get("relationships", []):
+        # Extract relationship information
+        target_name = rel.get("target_entity", "").strip()
+        rel_type = rel.get("relationship_type", "RELATED_TO").upper().replace(" ", "_")
         
-        result = graph.query(query, params={
-            "id": target_id,
-            "properties": entity_properties
-        })
+        # Skip if target entity name is missing
+        if not target_name:
+            continue
+            
+        # Ensure relationship type is valid for Neo4j (uppercase, no spaces)
+        rel_type = sanitize_identifier(rel_type)
         
-        entity_id = result[0]["id"] if result else target_id
+        # Add relationship properties if available
+        rel_properties = {}
+        details = rel.get("details")
+        if details:
+            rel_properties["details"] = details
         
-        # Process relationships if available
-        relationships = entity_data.get("relationships", [])
-        for rel in relationships:
-            # Extract relationship information
-            target_name = rel.get("target_entity", "").strip()
-            rel_type = rel.get("relationship_type", "RELATED_TO").upper().replace(" ", "_")
-            
-            # Skip if target entity name is missing
-            if not target_name:
-                continue
-                
-            # Ensure relationship type is valid for Neo4j (uppercase, no spaces)
-            rel_type = "".join(c if c.isalnum() or c == "_" else "_" for c in rel_type)
-            
+        relationship_rows.append({
             # Generate a target entity ID
-            target_id = f"{target_name.lower().replace(' ', '_')}_id"
-            
-            # Create or merge the target entity
-            target_query = f"""
-            MERGE (target:Entity {{id: $target_id}})
-            ON CREATE SET target.name = $target_name
-            """
-            
-            graph.query(target_query, params={
-                "target_id": target_id,
-                "target_name": target_name
-            })
-            
-            # Create the relationship
-            rel_query = f"""
-            MATCH (source {{id: $source_id}})
-            MATCH (target {{id: $target_id}})
-            MERGE (source)-[r:{rel_type}]->(target)
-            """
-            
-            # Add relationship properties if available
-            rel_properties = {}
-            details = rel.get("details")
-            if details:
-                rel_properties["details"] = details
-            
-            # Add properties to query if available
-            if rel_properties:
-                rel_query += "\nSET r += $rel_properties"
-                
-            graph.query(rel_query, params={
-                "source_id": entity_id,
-                "target_id": target_id,
-                "rel_properties": rel_properties
-            })
+            "target_id": entity_id_for_name(target_name),
+            "target_name": target_name,
+            "rel_type": rel_type,
+            "properties": rel_properties
+        })
+    
+    # Update or create entity node
+    query = f"""
+    MERGE (e:{entity_type} {{id: $id}})
+    SET e += $properties
+    RETURN e.id as id
+    """
+    
+    def write_entity(tx, use_apoc):
+        record = tx.run(query, {"id": target_id, "properties": entity_properties}).single()
+        written_id = record["id"] if record else target_id
+        if relationship_rows:
+            write_entity_relationships(tx, written_id, relationship_rows, use_apoc)
+        return written_id
+    
+    try:
+        # The entity and all its relationships are written in one transaction
+        try:
+            entity_id = run_write_transaction(graph, write_entity, True)
+        except Exception as e:
+            if not relationship_rows:
+                raise
+            if VERBOSE:
+                print(f"  APOC relationship merge unavailable, batching per relationship type: {e}")
+            entity_id = run_write_transaction(graph, write_entity, False)
+        
+        # The entity or its relationship targets may have introduced new labels
+        fetch_entity_types.cache_clear()
         
         print(f"✓ Successfully updated entity {name} in Neo4j")
         return entity_id
@@ -572,7 +1024,9 @@ def process_entity_from_documents(
     graph: Neo4jGraph, 
     llm: Ollama,
     entity_id: str,
-    document_chunks: List[Dict[str, Any]]
+    document_chunks: List[Dict[str, Any]],
+    max_workers: int = 4,
+    entity_record: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
     """
     Process an entity from multiple document chunks to create an enhanced entity profile.
@@ -582,6 +1036,8 @@ def process_entity_from_documents(
         llm: Language model
         entity_id: ID of the entity to enhance
         document_chunks: List of document chunks related to the entity
+        max_workers: Number of chunks sent to the LLM concurrently
+        entity_record: Entity as returned by get_entity_record, if already fetched
     
     Returns:
         Dictionary with consolidated entity information
@@ -590,50 +1046,62 @@ def process_entity_from_documents(
         print("No document chunks provided for processing")
         return {}
     
-    # Get entity information from the graph
-    entity_query = """
-    MATCH (e {id: $entity_id})
-    RETURN e.id as id, e.name as name, e.description as description, 
-           e.type as type, labels(e) as labels
-    """
+    # Get entity information from the graph unless the caller already looked it up
+    if entity_record is None:
+        entity_record = get_entity_record(graph, entity_id)
     
-    entity_result = graph.query(entity_query, params={"entity_id": entity_id})
-    
-    if not entity_result:
+    if not entity_record:
         print(f"❌ Entity with ID {entity_id} not found in the graph")
         return {}
     
-    entity_record = entity_result[0]
     entity_name = entity_record["name"]
     entity_type = entity_record["type"] or entity_record["labels"][0]
     
     print(f"\nEnhancing entity: {entity_name} (Type: {entity_type})")
     
-    # Process each document chunk
+    # Extract focused information about the entity from all chunks concurrently;
+    # results are collected in chunk order so consolidation stays deterministic
+    # Only the text column of the chunk records is needed from here on. Chunks that
+    # never mention the entity would only come back as not found, so skip the LLM
+    # call for them entirely
+    entity_name_lower = entity_name.lower()
+    chunk_texts = [
+        chunk["text"] for chunk in document_chunks
+        if entity_name_lower in chunk["text"].lower()
+    ]
+    skipped_count = len(document_chunks) - len(chunk_texts)
+    if skipped_count:
+        print(f"Skipping {skipped_count} chunks that do not mention {entity_name}")
+    print(f"Processing {len(chunk_texts)} chunks with {max_workers} workers")
     chunk_results = []
-    for i, chunk in enumerate(document_chunks):
-        print(f"\nProcessing chunk {i+1}/{len(document_chunks)}")
-        
-        # Extract focused information about the entity
-        extraction_result = extract_focused_entity_info(
-            text=chunk["text"],
-            entity_name=entity_name,
-            entity_type=entity_type,
-            llm=llm
-        )
-        
-        # Skip if extraction failed or entity not found in this chunk
-        if extraction_result.get("error") or extraction_result.get("not_found"):
-            print(f"  Skipping chunk {i+1} - Entity not found or extraction error")
-            continue
-        
-        # Add to results
-        chunk_results.append(extraction_result)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                extract_focused_entity_info,
+                text=text,
+                entity_name=entity_name,
+                entity_type=entity_type,
+                llm=llm
+            )
+            for text in chunk_texts
+        ]
         
-        # Print some info about what was found
-        properties_count = len(extraction_result.get("properties", {}))
-        relationships_count = len(extraction_result.get("relationships", []))
-        print(f"  Found {properties_count} properties and {relationships_count} relationships")
+        for i, future in enumerate(futures):
+            extraction_result = future.result()
+            print(f"\nProcessed chunk {i+1}/{len(chunk_texts)}")
+            
+            # Skip if extraction failed or entity not found in this chunk
+            if extraction_result.get("error") or extraction_result.get("not_found"):
+                print(f"  Skipping chunk {i+1} - Entity not found or extraction error")
+                continue
+            
+            # Add to results
+            chunk_results.append(extraction_result)
+            
+            # Print some info about what was found
+            properties_count = len(extraction_result.get("properties", {}))
+            relationships_count = len(extraction_result.get("relationships", []))
+            print(f"  Found {properties_count} properties and {relationships_count} relationships")
     
     # Merge results from all chunks
     if not chunk_results:
@@ -646,12 +1114,13 @@ def process_entity_from_documents(
     # Track property and relationship counts for merging
     all_properties = {}
     all_relationships = {}
+    relationship_details = {}
     
     # Process each extraction result
     for result in chunk_results:
         # Merge properties
         for prop, value in result.get("properties", {}).items():
-            all_properties[prop] = all_properties.get(prop, []) + [value]
+            all_properties.setdefault(prop, []).append(value)
         
         # Track relationships by target entity
         for rel in result.get("relationships", []):
@@ -664,46 +1133,33 @@ def process_entity_from_documents(
             
             if key not in all_relationships:
                 all_relationships[key] = rel
-            else:
-                # If we have this relationship already, merge details
-                existing_details = all_relationships[key].get("details", "")
-                new_details = rel.get("details", "")
-                
-                if new_details and new_details not in existing_details:
-                    if existing_details:
-                        all_relationships[key]["details"] = f"{existing_details}; {new_details}"
-                    else:
-                        all_relationships[key]["details"] = new_details
+            
+            # Collect details from every mention; they are joined once after the loop
+            details = rel.get("details")
+            if details:
+                relationship_details.setdefault(key, []).append(str(details))
+    
+    # Merge the details of each relationship, dropping repeats but keeping their order
+    for key, details_list in relationship_details.items():
+        all_relationships[key]["details"] = "; ".join(dict.fromkeys(details_list))
     
     # Consolidate properties by selecting the most common value for each
     consolidated_properties = {}
     for prop, values in all_properties.items():
-        # Count frequency of each value
-        value_counts = {}
+        # Count frequency of each value, remembering the first original object per key
+        value_counts = Counter()
+        original_values = {}
         for val in values:
             if val is not None:
                 # Convert unhashable types (like lists) to strings for counting
-                if isinstance(val, (list, dict)):
-                    val_key = str(val)
-                else:
-                    val_key = val
-                    
-                value_counts[val_key] = value_counts.get(val_key, 0) + 1
+                val_key = str(val) if isinstance(val, (list, dict)) else val
+                value_counts[val_key] += 1
+                original_values.setdefault(val_key, val)
         
         # Select the most common value
         if value_counts:
-            most_common_key = max(value_counts.items(), key=lambda x: x[1])[0]
-            
-            # If the most common key is a string representation of a list/dict, 
-            # find the original value from values list
-            if isinstance(most_common_key, str) and (most_common_key.startswith('[') or most_common_key.startswith('{')):
-                for val in values:
-                    if str(val) == most_common_key:
-                        consolidated_properties[prop] = val
-                        break
-            else:
-                # Use the key directly if it's not a string representation
-                consolidated_properties[prop] = most_common_key
+            most_common_key = value_counts.most_common(1)[0][0]
+            consolidated_properties[prop] = original_values[most_common_key]
         
     # Create consolidated entity data
     consolidated_entity = {
@@ -726,7 +1182,8 @@ def process_entity_from_file(
     entity_id: str,
     document_path: str,
     chunk_size: int = 1000,
-    chunk_overlap: int = 200
+    chunk_overlap: int = 200,
+    max_workers: int = 4
 ) -> Dict[str, Any]:
     """
     Process an entity from a source document file.
@@ -738,24 +1195,18 @@ def process_entity_from_file(
         document_path: Path to the document
         chunk_size: Size of text chunks
         chunk_overlap: Overlap between chunks
+        max_workers: Number of chunks sent to the LLM concurrently
     
     Returns:
         Dictionary with consolidated entity information
     """
     # Get entity information from the graph
-    entity_query = """
-    MATCH (e {id: $entity_id})
-    RETURN e.id as id, e.name as name, e.description as description, 
-           e.type as type, labels(e) as labels
-    """
-    
-    entity_result = graph.query(entity_query, params={"entity_id": entity_id})
+    entity_record = get_entity_record(graph, entity_id)
     
-    if not entity_result:
+    if not entity_record:
         print(f"❌ Entity with ID {entity_id} not found in the graph")
         return {}
     
-    entity_record = entity_result[0]
     entity_name = entity_record["name"]
     entity_type = entity_record["type"] or entity_record["labels"][0]
     
@@ -787,7 +1238,10 @@ def process_entity_from_file(
         })
     
     # Process the chunks
-    return process_entity_from_documents(graph, llm, entity_id, document_chunks)
+    return process_entity_from_documents(
+        graph, llm, entity_id, document_chunks,
+        max_workers=max_workers, entity_record=entity_record
+    )
 
 def save_extraction_results(
     entity_data: Dict[str, Any], 
@@ -808,8 +1262,12 @@ def save_extraction_results(
     output_path = os.path.join(output_dir, filename)
     
     # Save to file
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(entity_data, f, indent=2)
+    if orjson is not None:
+        # Serialized to bytes in one call and written in a single write
+        Path(output_path).write_bytes(orjson.dumps(entity_data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(entity_data, f, indent=2)
     
     print(f"✓ Saved extraction results to {output_path}")
     return output_path
@@ -819,14 +1277,48 @@ def list_available_documents(documents_dir: str = "documents") -> List[str]:
     # Create the directory if it doesn't exist
     Path(documents_dir).mkdir(parents=True, exist_ok=True)
     
-    # Find document files
-    document_files = []
-    for ext in ["*.txt", "*.pdf", "*.md"]:
-        document_files.extend(list(Path(documents_dir).glob(ext)))
+    # Find document files, reading the directory entries only once
+    with os.scandir(documents_dir) as entries:
+        document_files = [
+            entry.path for entry in entries
+            if DOCUMENT_FILE_PATTERN.search(entry.name) and entry.is_file()
+        ]
     
-    return [str(path) for path in sorted(document_files)]
+    # Sort the path strings in place, ignoring case
+    document_files.sort(key=str.lower)
+    return document_files
 
-def main():
+def print_entity_listing(entities, start: int = 1, batch_size: int = 100):
+    """
+    Print a numbered entity listing. Lines are collected and written to stdout in
+    batches, so long listings do not cost one write per line.
+    """
+    lines = []
+    for i, entity in enumerate(entities, start):
+        lines.append(f"{i}. {entity.get('name', 'Unnamed')} (ID: {entity.get('id', 'No ID')})\n")
+        if entity.get('description'):
+            lines.append(f"   Description: {entity['description']}...\n")
+        if len(lines) >= batch_size:
+            sys.stdout.write("".join(lines))
+            lines.clear()
+    
+    if lines:
+        sys.stdout.write("".join(lines))
+
+def pick_index(prompt: str, count: int) -> int:
+    """Ask until the user enters a number from 1 to count, and return it as a 0-based index."""
+    while True:
+        try:
+            index = int(input(f"\n{prompt} (1-{count}): ")) - 1
+        except ValueError:
+            print("Please enter a valid number")
+            continue
+        if 0 <= index < count:
+            return index
+        print(f"Please enter a number between 1 and {count}")
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    """Build the command-line parser for this script."""
     parser = argparse.ArgumentParser(description="Entity-focused extraction from documents")
     
     # Operational modes
@@ -840,308 +1332,332 @@ def main():
     parser.add_argument("--temperature", type=float, default=0.1, help="LLM temperature")
     parser.add_argument("--chunk-size", type=int, default=1000, help="Document chunk size")
     parser.add_argument("--chunk-overlap", type=int, default=200, help="Document chunk overlap")
+    parser.add_argument("--workers", type=int, default=4, help="Number of chunks to extract from concurrently")
+    parser.add_argument("--llm-cache-dir", default="llm_cache", help="Directory for cached LLM extraction responses")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Always call the LLM instead of reusing cached responses")
     parser.add_argument("--output-dir", default="extracted_entities", help="Output directory for extraction results")
     parser.add_argument("--interactive", action="store_true", help="Run in interactive mode")
     parser.add_argument("--verbose", action="store_true", help="Enable verbose output")
     
-    args = parser.parse_args()
-    
-    # Set up global verbosity
-    global VERBOSE
-    VERBOSE = args.verbose
-    
-    # Initialize Neo4j connection
-    try:
-        graph = initialize_neo4j_connection()
-    except Exception as e:
-        print(f"\nCould not connect to Neo4j: {e}")
-        print("Please ensure Neo4j is running and credentials are correct.")
-        return
-    
-    # List entities if requested
-    if args.list_entities:
-        if args.entity_type:
-            # List entities of a specific type
-            entities = get_entities_by_type(graph, args.entity_type)
-            print(f"\nEntities of type '{args.entity_type}' in the graph:")
-            for i, entity in enumerate(entities):
-                print(f"{i+1}. {entity['name']} (ID: {entity['id']})")
-                if entity.get('description'):
-                    print(f"   Description: {entity['description'][:100]}...")
-        else:
-            # List entity types
-            entity_types = get_entity_types(graph)
-            print("\nAvailable entity types in the graph:")
-            for i, entity_type in enumerate(entity_types):
-                count_query = f"MATCH (e:{entity_type}) RETURN count(e) as count"
-                count = graph.query(count_query)[0]["count"]
-                print(f"{i+1}. {entity_type} ({count} entities)")
-            
-            # Prompt for entity type selection
-            if entity_types and input("\nDo you want to see entities of a specific type? (y/n): ").lower() == 'y':
-                selection = input(f"Enter type number (1-{len(entity_types)}): ")
-                try:
-                    index = int(selection) - 1
-                    if 0 <= index < len(entity_types):
-                        selected_type = entity_types[index]
-                        entities = get_entities_by_type(graph, selected_type)
-                        print(f"\nEntities of type '{selected_type}':")
-                        for i, entity in enumerate(entities):
-                            print(f"{i+1}. {entity['name']} (ID: {entity['id']})")
-                            if entity.get('description'):
-                                print(f"   Description: {entity['description'][:100]}...")
-                except ValueError:
-                    print("Invalid selection")
-        return
-    
-    # Interactive mode
-    if args.interactive:
-        print("\n" + "="*60)
-        print("ENTITY-FOCUSED EXTRACTION")
-        print("="*60)
+    return parser
+
+# Built once at import time and shared by every call to main()
+ARG_PARSER = build_arg_parser()
+
+def save_and_update_entity(
+    graph: Neo4jGraph, 
+    consolidated_entity: Dict[str, Any], 
+    entity_id: str, 
+    entity_label: str,
+    output_dir: str
+):
+    """Save the consolidated entity to a file, write it back to the graph and report the outcome."""
+    if consolidated_entity:
+        # Save to file
+        save_path = save_extraction_results(consolidated_entity, output_dir)
         
-        # Initialize LLM
-        try:
-            llm = initialize_llm(model_name=args.model, temperature=args.temperature)
-        except Exception as e:
-            print(f"\nCould not initialize LLM: {e}")
-            print("Please ensure Ollama is running and the model is available.")
-            return
+        # Update the entity in the graph
+        print("\nUpdating entity in the graph...")
+        updated_id = update_entity_in_graph(graph, consolidated_entity, entity_id)
         
-        # Step 1: Select entity type
+        print(f"\n✓ Successfully processed entity {entity_label}")
+        print(f"  Updated entity ID: {updated_id}")
+        print(f"  Results saved to: {save_path}")
+    else:
+        print(f"\n❌ Failed to process entity {entity_label}")
+
+def handle_list(args: argparse.Namespace, graph: Neo4jGraph):
+    """List entity types, or the entities of one type."""
+    if args.entity_type:
+        # List entities of a specific type
+        print(f"\nEntities of type '{args.entity_type}' in the graph:")
+        print_entity_listing(stream_entities_by_type(
+            graph, args.entity_type, description_chars=LISTING_DESCRIPTION_CHARS
+        ))
+    else:
+        # List entity types
         entity_types = get_entity_types(graph)
-        print("\nAvailable entity types:")
+        entity_counts = get_entity_type_counts(graph, entity_types)
+        print("\nAvailable entity types in the graph:")
         for i, entity_type in enumerate(entity_types):
-            count_query = f"MATCH (e:{entity_type}) RETURN count(e) as count"
-            count = graph.query(count_query)[0]["count"]
-            print(f"{i+1}. {entity_type} ({count} entities)")
-        
-        if not entity_types:
-            print("No entity types found in the graph.")
-            return
+            print(f"{i+1}. {entity_type} ({entity_counts[entity_type]} entities)")
         
-        # Get entity type selection
-        selected_type_index = -1
-        while selected_type_index < 0 or selected_type_index >= len(entity_types):
+        # Prompt for entity type selection
+        if entity_types and input("\nDo you want to see entities of a specific type? (y/n): ").lower() == 'y':
+            selection = input(f"Enter type number (1-{len(entity_types)}): ")
             try:
-                selection = input(f"\nSelect an entity type (1-{len(entity_types)}): ")
-                selected_type_index = int(selection) - 1
-                if selected_type_index < 0 or selected_type_index >= len(entity_types):
-                    print(f"Please enter a number between 1 and {len(entity_types)}")
+                index = int(selection) - 1
+                if 0 <= index < len(entity_types):
+                    selected_type = entity_types[index]
+                    print(f"\nEntities of type '{selected_type}':")
+                    print_entity_listing(stream_entities_by_type(
+                        graph, selected_type, description_chars=LISTING_DESCRIPTION_CHARS
+                    ))
             except ValueError:
-                print("Please enter a valid number")
-        
-        selected_type = entity_types[selected_type_index]
+                print("Invalid selection")
+
+def handle_interactive(args: argparse.Namespace, graph: Neo4jGraph):
+    """Select an entity and a source interactively, then process the entity."""
+    print("\n" + "="*60)
+    print("ENTITY-FOCUSED EXTRACTION")
+    print("="*60)
+    
+    # Initialize LLM
+    llm = get_llm_or_report(args.model, args.temperature)
+    if llm is None:
+        return
+    
+    # Step 1: Select entity type
+    entity_types = get_entity_types(graph)
+    entity_counts = get_entity_type_counts(graph, entity_types)
+    print("\nAvailable entity types:")
+    for i, entity_type in enumerate(entity_types):
+        print(f"{i+1}. {entity_type} ({entity_counts[entity_type]} entities)")
+    
+    if not entity_types:
+        print("No entity types found in the graph.")
+        return
+    
+    # While the user chooses, prefetch the first entity page of the largest types
+    prefetch_types = sorted(entity_types, key=lambda t: entity_counts[t], reverse=True)[:PREFETCH_ENTITY_TYPES]
+    prefetch_executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(prefetch_types))
+    prefetched_pages = {
+        entity_type: prefetch_executor.submit(
+            get_entities_by_type, graph, entity_type, limit=ENTITY_PAGE_SIZE + 1, offset=0,
+            description_chars=LISTING_DESCRIPTION_CHARS
+        )
+        for entity_type in prefetch_types
+    }
+    # Let the prefetches finish in the background without blocking on them
+    prefetch_executor.shutdown(wait=False)
+    
+    # Get entity type selection
+    selected_type = entity_types[pick_index("Select an entity type", len(entity_types))]
+    
+    # Step 2: Select entity, fetching one page of entities at a time
+    page = 0
+    selected_entity = None
+    while selected_entity is None:
+        offset = page * ENTITY_PAGE_SIZE
+        # Fetch one extra row to know whether there is a next page
+        if page == 0 and selected_type in prefetched_pages:
+            entities = prefetched_pages[selected_type].result()
+        else:
+            entities = get_entities_by_type(
+                graph, selected_type, limit=ENTITY_PAGE_SIZE + 1, offset=offset,
+                description_chars=LISTING_DESCRIPTION_CHARS
+            )
+        has_next_page = len(entities) > ENTITY_PAGE_SIZE
+        entities = entities[:ENTITY_PAGE_SIZE]
         
-        # Step 2: Select entity
-        entities = get_entities_by_type(graph, selected_type)
         if not entities:
-            print(f"No entities found of type '{selected_type}'")
-            return
+            if page == 0:
+                print(f"No entities found of type '{selected_type}'")
+                return
+            # The last page became empty (e.g. entities were deleted); step back
+            page -= 1
+            continue
+        
+        print(f"\nEntities of type '{selected_type}' (page {page + 1}):")
+        print_entity_listing(entities, start=offset + 1)
         
-        print(f"\nEntities of type '{selected_type}':")
-        for i, entity in enumerate(entities):
-            name = entity.get('name', 'Unnamed')
-            entity_id = entity.get('id', 'No ID')
-            print(f"{i+1}. {name} (ID: {entity_id})")
-            if entity.get('description'):
-                print(f"   Description: {entity['description'][:100]}...")
+        # Get entity selection or page navigation
+        navigation = []
+        if has_next_page:
+            navigation.append("[n]ext")
+        if page > 0:
+            navigation.append("[p]rev")
+        navigation_hint = f", {' / '.join(navigation)} page" if navigation else ""
         
-        # Get entity selection
-        selected_entity_index = -1
-        while selected_entity_index < 0 or selected_entity_index >= len(entities):
+        while True:
+            selection = input(f"\nSelect an entity ({offset + 1}-{offset + len(entities)}{navigation_hint}): ").strip().lower()
+            if selection == "n" and has_next_page:
+                page += 1
+                break
+            if selection == "p" and page > 0:
+                page -= 1
+                break
             try:
-                selection = input(f"\nSelect an entity (1-{len(entities)}): ")
-                selected_entity_index = int(selection) - 1
-                if selected_entity_index < 0 or selected_entity_index >= len(entities):
-                    print(f"Please enter a number between 1 and {len(entities)}")
+                selected_entity_index = int(selection) - 1 - offset
+                if 0 <= selected_entity_index < len(entities):
+                    selected_entity = entities[selected_entity_index]
+                    break
+                print(f"Please enter a number between {offset + 1} and {offset + len(entities)}")
             except ValueError:
                 print("Please enter a valid number")
+    
+    entity_id = selected_entity['id']
+    entity_name = selected_entity['name']
+    
+    print(f"\nSelected entity: {entity_name} (ID: {entity_id})")
+    
+    # Step 3: Choose processing mode
+    print("\nProcessing options:")
+    print("1. Process from existing document chunks in graph")
+    print("2. Process from a document file")
+    
+    mode = ""
+    while mode not in ["1", "2"]:
+        mode = input("Select an option (1-2): ")
+    
+    # Process based on selected mode
+    if mode == "1":
+        # Process from existing chunks
+        print(f"\nFinding document chunks related to '{entity_name}'...")
+        entity_record, document_chunks = fetch_entity_and_chunks(graph, entity_id)
         
-        selected_entity = entities[selected_entity_index]
-        entity_id = selected_entity['id']
-        entity_name = selected_entity['name']
+        if not document_chunks:
+            print(f"No document chunks found related to '{entity_name}'")
+            return
         
-        print(f"\nSelected entity: {entity_name} (ID: {entity_id})")
+        print(f"Found {len(document_chunks)} related document chunks")
         
-        # Step 3: Choose processing mode
-        print("\nProcessing options:")
-        print("1. Process from existing document chunks in graph")
-        print("2. Process from a document file")
+        # Process the entity
+        consolidated_entity = process_entity_from_documents(
+            graph=graph,
+            llm=llm,
+            entity_id=entity_id,
+            document_chunks=document_chunks,
+            max_workers=args.workers,
+            entity_record=entity_record
+        )
         
-        mode = ""
-        while mode not in ["1", "2"]:
-            mode = input("Select an option (1-2): ")
+    else:
+        # Process from document file
+        document_files = list_available_documents()
         
-        # Process based on selected mode
-        if mode == "1":
-            # Process from existing chunks
-            print(f"\nFinding document chunks related to '{entity_name}'...")
-            document_chunks = get_related_documents(graph, entity_id)
-            
-            if not document_chunks:
-                print(f"No document chunks found related to '{entity_name}'")
+        if not document_files:
+            print("No document files found in the 'documents' directory")
+            custom_path = os.path.expanduser(input("Enter path to a document file: ").strip())
+            # The path must be a regular file; a directory would only fail later when loaded
+            if os.path.isfile(custom_path):
+                document_path = custom_path
+            else:
+                print(f"File not found: {custom_path}")
                 return
-            
-            print(f"Found {len(document_chunks)} related document chunks")
-            
-            # Process the entity
-            consolidated_entity = process_entity_from_documents(
-                graph=graph,
-                llm=llm,
-                entity_id=entity_id,
-                document_chunks=document_chunks
-            )
-            
         else:
-            # Process from document file
-            document_files = list_available_documents()
-            
-            if not document_files:
-                print("No document files found in the 'documents' directory")
-                custom_path = input("Enter path to a document file: ")
-                if os.path.exists(custom_path):
-                    document_path = custom_path
-                else:
-                    print(f"File not found: {custom_path}")
-                    return
-            else:
-                print("\nAvailable documents:")
-                for i, path in enumerate(document_files):
-                    print(f"{i+1}. {os.path.basename(path)}")
-                
-                # Get document selection
-                selected_doc_index = -1
-                while selected_doc_index < 0 or selected_doc_index >= len(document_files):
-                    try:
-                        selection = input(f"\nSelect a document (1-{len(document_files)}): ")
-                        selected_doc_index = int(selection) - 1
-                        if selected_doc_index < 0 or selected_doc_index >= len(document_files):
-                            print(f"Please enter a number between 1 and {len(document_files)}")
-                    except ValueError:
-                        print("Please enter a valid number")
-                
-                document_path = document_files[selected_doc_index]
+            print("\nAvailable documents:")
+            for i, path in enumerate(document_files):
+                print(f"{i+1}. {os.path.basename(path)}")
             
-            print(f"\nProcessing entity '{entity_name}' from document: {document_path}")
-            
-            # Process the entity from the document
-            consolidated_entity = process_entity_from_file(
-                graph=graph,
-                llm=llm,
-                entity_id=entity_id,
-                document_path=document_path,
-                chunk_size=args.chunk_size,
-                chunk_overlap=args.chunk_overlap
-            )
+            # Get document selection
+            document_path = document_files[pick_index("Select a document", len(document_files))]
         
-        # Step 4: Save and update results
-        if consolidated_entity:
-            # Save to file
-            save_path = save_extraction_results(consolidated_entity, args.output_dir)
-            
-            # Update the entity in the graph
-            print("\nUpdating entity in the graph...")
-            updated_id = update_entity_in_graph(graph, consolidated_entity, entity_id)
-            
-            print(f"\n✓ Successfully processed entity '{entity_name}'")
-            print(f"  Updated entity ID: {updated_id}")
-            print(f"  Results saved to: {save_path}")
-        else:
-            print(f"\n❌ Failed to process entity '{entity_name}'")
-    
-    # Non-interactive mode with specific entity ID and document
-    elif args.entity_id and args.document:
-        # Initialize LLM
-        try:
-            llm = initialize_llm(model_name=args.model, temperature=args.temperature)
-        except Exception as e:
-            print(f"\nCould not initialize LLM: {e}")
-            print("Please ensure Ollama is running and the model is available.")
-            return
+        print(f"\nProcessing entity '{entity_name}' from document: {document_path}")
         
         # Process the entity from the document
         consolidated_entity = process_entity_from_file(
             graph=graph,
             llm=llm,
-            entity_id=args.entity_id,
-            document_path=args.document,
+            entity_id=entity_id,
+            document_path=document_path,
             chunk_size=args.chunk_size,
-            chunk_overlap=args.chunk_overlap
+            chunk_overlap=args.chunk_overlap,
+            max_workers=args.workers
         )
-        
-        if consolidated_entity:
-            # Save to file
-            save_path = save_extraction_results(consolidated_entity, args.output_dir)
-            
-            # Update the entity in the graph
-            print("\nUpdating entity in the graph...")
-            updated_id = update_entity_in_graph(graph, consolidated_entity, args.entity_id)
-            
-            print(f"\n✓ Successfully processed entity ID '{args.entity_id}'")
-            print(f"  Updated entity ID: {updated_id}")
-            print(f"  Results saved to: {save_path}")
-        else:
-            print(f"\n❌ Failed to process entity ID '{args.entity_id}'")
     
-    # Entity ID but no document (process from existing chunks)
-    elif args.entity_id:
-        # Initialize LLM
-        try:
-            llm = initialize_llm(model_name=args.model, temperature=args.temperature)
-        except Exception as e:
-            print(f"\nCould not initialize LLM: {e}")
-            print("Please ensure Ollama is running and the model is available.")
-            return
-        
-        # Get entity information
-        entity_query = """
-        MATCH (e {id: $entity_id})
-        RETURN e.id as id, e.name as name
-        """
-        entity_result = graph.query(entity_query, params={"entity_id": args.entity_id})
-        
-        if not entity_result:
-            print(f"Entity with ID '{args.entity_id}' not found in the graph")
-            return
-        
-        entity_name = entity_result[0]["name"]
-        
-        # Find related document chunks
-        print(f"\nFinding document chunks related to entity '{entity_name}'...")
-        document_chunks = get_related_documents(graph, args.entity_id)
-        
-        if not document_chunks:
-            print(f"No document chunks found related to entity '{entity_name}'")
-            return
-        
-        print(f"Found {len(document_chunks)} related document chunks")
-        
-        # Process the entity
-        consolidated_entity = process_entity_from_documents(
-            graph=graph,
-            llm=llm,
-            entity_id=args.entity_id,
-            document_chunks=document_chunks
-        )
-        
-        if consolidated_entity:
-            # Save to file
-            save_path = save_extraction_results(consolidated_entity, args.output_dir)
-            
-            # Update the entity in the graph
-            print("\nUpdating entity in the graph...")
-            updated_id = update_entity_in_graph(graph, consolidated_entity, args.entity_id)
-            
-            print(f"\n✓ Successfully processed entity '{entity_name}'")
-            print(f"  Updated entity ID: {updated_id}")
-            print(f"  Results saved to: {save_path}")
-        else:
-            print(f"\n❌ Failed to process entity '{entity_name}'")
+    # Step 4: Save and update results
+    save_and_update_entity(graph, consolidated_entity, entity_id, f"'{entity_name}'", args.output_dir)
+
+def handle_file(args: argparse.Namespace, graph: Neo4jGraph):
+    """Process the entity given by --entity-id from the --document file."""
+    # Initialize LLM
+    llm = get_llm_or_report(args.model, args.temperature)
+    if llm is None:
+        return
     
-    else:
+    # Process the entity from the document
+    consolidated_entity = process_entity_from_file(
+        graph=graph,
+        llm=llm,
+        entity_id=args.entity_id,
+        document_path=args.document,
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        max_workers=args.workers
+    )
+    
+    save_and_update_entity(graph, consolidated_entity, args.entity_id, f"ID '{args.entity_id}'", args.output_dir)
+
+def handle_chunks(args: argparse.Namespace, graph: Neo4jGraph):
+    """Process the entity given by --entity-id from its related chunks in the graph."""
+    # Initialize LLM
+    llm = get_llm_or_report(args.model, args.temperature)
+    if llm is None:
+        return
+    
+    # Get entity information and its related document chunks in one query;
+    # the entity is shared with the processing step below
+    print(f"\nFinding document chunks related to entity '{args.entity_id}'...")
+    entity_record, document_chunks = fetch_entity_and_chunks(graph, args.entity_id)
+    
+    if not entity_record:
+        print(f"Entity with ID '{args.entity_id}' not found in the graph")
+        return
+    
+    entity_name = entity_record["name"]
+    
+    if not document_chunks:
+        print(f"No document chunks found related to entity '{entity_name}'")
+        return
+    
+    print(f"Found {len(document_chunks)} related document chunks")
+    
+    # Process the entity
+    consolidated_entity = process_entity_from_documents(
+        graph=graph,
+        llm=llm,
+        entity_id=args.entity_id,
+        document_chunks=document_chunks,
+        max_workers=args.workers,
+        entity_record=entity_record
+    )
+    
+    save_and_update_entity(graph, consolidated_entity, args.entity_id, f"'{entity_name}'", args.output_dir)
+
+def resolve_mode(args: argparse.Namespace) -> Optional[str]:
+    """Pick the operating mode from the command-line arguments."""
+    if args.list_entities:
+        return "list"
+    if args.interactive:
+        return "interactive"
+    if args.entity_id and args.document:
+        return "file"
+    if args.entity_id:
+        return "chunks"
+    return None
+
+# Handler for each operating mode; each takes the parsed arguments and the graph
+MODE_HANDLERS = {
+    "list": handle_list,
+    "interactive": handle_interactive,
+    "file": handle_file,
+    "chunks": handle_chunks
+}
+
+def main():
+    args = ARG_PARSER.parse_args()
+    
+    # Set up global verbosity
+    global VERBOSE, LLM_CACHE_DIR
+    VERBOSE = args.verbose
+    LLM_CACHE_DIR = None if args.no_llm_cache else args.llm_cache_dir
+    
+    mode = resolve_mode(args)
+    if mode is None:
         print("\nNo operation specified. Use --interactive or provide --entity-id")
         print("Use --help for more information about available options")
+        return
+    
+    # Initialize Neo4j connection
+    try:
+        graph = initialize_neo4j_connection()
+    except Exception as e:
+        print(f"\nCould not connect to Neo4j: {e}")
+        print("Please ensure Neo4j is running and credentials are correct.")
+        return
+    
+    MODE_HANDLERS[mode](args, graph)
 
 
 if __name__ == "__main__":
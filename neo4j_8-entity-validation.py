@@ -3,8 +3,10 @@ import os
 import argparse
 from dotenv import load_dotenv
 import warnings
-from typing import List, Dict, Any, Tuple, Set
+from typing import List, Dict, Any, Tuple, Set, FrozenSet, Iterator, Optional
 import time
+import functools
+import itertools
 import re
 from pathlib import Path
 import json
@@ -14,13 +16,51 @@ from langchain_community.graphs import Neo4jGraph
 from langchain_community.llms import Ollama
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.globals import set_llm_cache
+from langchain_community.cache import SQLiteCache
 from langchain.schema import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
+# Optional: pyahocorasick scans for all entity names in a single pass
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Optional faster JSON decoder; the standard library is used when absent
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional repair of slightly malformed JSON from the LLM
+try:
+    from json_repair import repair_json
+except ImportError:
+    repair_json = None
+
 # Load environment variables from .env file
 load_dotenv()
 warnings.filterwarnings("ignore")
 
+# System labels that are not treated as entity types
+EXCLUDED_LABELS = ["Document", "Chunk", "Source", "File"]
+
+# Number of entities deleted per write transaction
+DELETE_BATCH_SIZE = 1000
+
+# Number of characters read from disk at a time when streaming a document
+DOCUMENT_READ_SIZE = 64 * 1024
+
+# Paragraph break, the first separator RecursiveCharacterTextSplitter cuts a document at
+PARAGRAPH_BREAK_PATTERN = re.compile(r"\n\n")
+
+# OpenAI-compatible endpoint of the vLLM server used with --backend vllm
+VLLM_BASE_URL = os.getenv("VLLM_BASE_URL", "http://localhost:8000/v1")
+
+# File name of the persistent LLM response cache inside the cache directory
+LLM_CACHE_FILE = "entity_validation.db"
+
 def initialize_neo4j_connection() -> Neo4jGraph:
     """Initialize and return a Neo4j graph connection."""
     try:
@@ -32,14 +72,56 @@ def initialize_neo4j_connection() -> Neo4jGraph:
         # Test connection
         graph.query("RETURN 1 as test")
         print("✓ Successfully connected to Neo4j")
+        ensure_entity_indexes(graph)
         return graph
     except Exception as e:
         print(f"❌ Failed to connect to Neo4j: {e}")
         print("  Please check your credentials and database availability.")
         raise e
 
-def initialize_llm(model_name: str = "llama3.1:latest", temperature: float = 0.1) -> Ollama:
-    """Initialize and return the LLM."""
+def quote_label(label: str) -> str:
+    """Backtick-quote a node label so any label name is safe to embed in Cypher."""
+    return "`" + label.replace("`", "``") + "`"
+
+def ensure_entity_indexes(graph: Neo4jGraph) -> None:
+    """Create indexes on id and name for every entity type so lookups are index seeks."""
+    try:
+        for entity_type in get_entity_types(graph):
+            label = quote_label(entity_type)
+            graph.query(f"CREATE INDEX IF NOT EXISTS FOR (n:{label}) ON (n.id)")
+            graph.query(f"CREATE INDEX IF NOT EXISTS FOR (n:{label}) ON (n.name)")
+    except Exception as e:
+        print(f"❌ Could not create entity indexes: {e}")
+
+def initialize_vllm(model_name: str, temperature: float = 0.1):
+    """Initialize and return an LLM served by a vLLM OpenAI-compatible server."""
+    # Imported here so the openai client is only needed for the vLLM backend
+    from langchain_community.llms import VLLMOpenAI
+    
+    settings = {
+        "model_name": model_name,
+        "temperature": temperature,
+        "openai_api_base": VLLM_BASE_URL,
+        "openai_api_key": "EMPTY"
+    }
+    
+    print(f"Attempting to use vLLM model: {model_name}")
+    llm = VLLMOpenAI(**settings)
+    
+    # Test the LLM with a simple query, bypassing the response cache
+    VLLMOpenAI(**settings, cache=False).invoke("Hello")
+    print(f"✓ Successfully connected to vLLM at {VLLM_BASE_URL} using model: {model_name}")
+    return llm
+
+def initialize_llm(model_name: str = "llama3.1:latest", temperature: float = 0.1, backend: str = "ollama") -> Ollama:
+    """Initialize and return the LLM. The vLLM backend falls back to Ollama if it is unavailable."""
+    if backend == "vllm":
+        try:
+            return initialize_vllm(model_name, temperature)
+        except Exception as e:
+            print(f"❌ Failed to use vLLM server at {VLLM_BASE_URL}: {e}")
+            print("  Falling back to Ollama.")
+    
     # List of models to try in order of preference
     models_to_try = [
         model_name,        # Try the specified model first
@@ -66,8 +148,13 @@ def initialize_llm(model_name: str = "llama3.1:latest", temperature: float = 0.1
                 base_url=base_url
             )
             
-            # Test the LLM with a simple query
-            test_response = llm.invoke("Hello")
+            # Test the LLM with a simple query, bypassing the response cache
+            test_response = Ollama(
+                model=model,
+                temperature=temperature,
+                base_url=base_url,
+                cache=False
+            ).invoke("Hello")
             print(f"✓ Successfully connected to Ollama using model: {model}")
             return llm
         except Exception as e:
@@ -77,209 +164,691 @@ def initialize_llm(model_name: str = "llama3.1:latest", temperature: float = 0.1
     # If we get here, all models failed
     raise ValueError(f"All LLM models failed. Last error: {last_exception}")
 
+def enable_llm_cache(cache_dir: str = "llm_cache") -> None:
+    """Persist LLM responses in SQLite so repeated prompts across runs skip the model."""
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    set_llm_cache(SQLiteCache(database_path=os.path.join(cache_dir, LLM_CACHE_FILE)))
+
+@functools.lru_cache(maxsize=4)
+def read_document(document_path: str, modified_time: float) -> str:
+    """
+    Read a document from disk. The result is cached per absolute path and
+    modification time, so a file is read again only after it changes.
+    """
+    with open(document_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
 def load_document(document_path: str) -> str:
     """Load document content from file."""
     try:
-        with open(document_path, 'r', encoding='utf-8') as f:
-            return f.read()
+        absolute_path = os.path.abspath(document_path)
+        return read_document(absolute_path, os.path.getmtime(absolute_path))
     except Exception as e:
         print(f"❌ Error loading document {document_path}: {e}")
         return ""
 
+def iter_document_chunks(document_path: str, chunk_size: int, chunk_overlap: int = 200) -> Iterator[str]:
+    """
+    Yield the chunks of a document while reading it from disk in blocks,
+    so large documents are never held in memory whole.
+    
+    The chunks are the same as splitting the whole document at once. Only the text
+    up to the last paragraph break read so far is split, and the raw text of the
+    chunk that may still grow is carried over to the next block.
+    """
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap
+    )
+    
+    try:
+        with open(document_path, 'r', encoding='utf-8') as f:
+            pending_text = ""
+            while True:
+                block = f.read(DOCUMENT_READ_SIZE)
+                if not block:
+                    break
+                pending_text += block
+                
+                # The splitter first cuts the text into paragraphs, each starting with its break.
+                # The last paragraph may continue in the next block, so it is not split yet.
+                paragraph_starts = [0] + [m.start() for m in PARAGRAPH_BREAK_PATTERN.finditer(pending_text)]
+                complete_end = paragraph_starts.pop()
+                if complete_end == 0:
+                    continue
+                
+                complete_text = pending_text[:complete_end]
+                chunks = text_splitter.split_text(complete_text)
+                if not chunks:
+                    pending_text = pending_text[complete_end:]
+                    continue
+                
+                if complete_end - paragraph_starts[-1] >= chunk_size:
+                    # The last paragraph was too long to merge and was split on its own,
+                    # so none of its chunks can grow
+                    yield from chunks
+                    pending_text = pending_text[complete_end:]
+                else:
+                    # The last chunk may take in following paragraphs, so split it again with
+                    # them, starting from the raw text of its first paragraph. Chunks are
+                    # stripped, so its position is counted back from the end of the text.
+                    last_chunk_start = len(complete_text.rstrip()) - len(chunks[-1])
+                    restart = max(start for start in paragraph_starts if start <= last_chunk_start)
+                    yield from chunks[:-1]
+                    pending_text = pending_text[restart:]
+            
+            if pending_text:
+                yield from text_splitter.split_text(pending_text)
+    except Exception as e:
+        print(f"❌ Error loading document {document_path}: {e}")
+
+@functools.lru_cache(maxsize=1)
+def fetch_entity_types(graph: Neo4jGraph) -> Tuple[str, ...]:
+    """
+    Query the entity types (node labels) of the graph. The result is cached per
+    connection; call clear_entity_caches() after writes that change the entities.
+    """
+    # Query to get all labels in the graph
+    result = graph.query("CALL db.labels() YIELD label RETURN label")
+    labels = [record["label"] for record in result]
+    
+    # Filter out system labels or labels you want to exclude
+    return tuple(label for label in labels if label not in EXCLUDED_LABELS)
+
 def get_entity_types(graph: Neo4jGraph) -> List[str]:
     """Get all entity types (node labels) from the Neo4j graph."""
     try:
-        # Query to get all labels in the graph
-        result = graph.query("CALL db.labels() YIELD label RETURN label")
-        labels = [record["label"] for record in result]
-        
-        # Filter out system labels or labels you want to exclude
-        excluded_labels = ["Document", "Chunk", "Source", "File"]
-        entity_types = [label for label in labels if label not in excluded_labels]
-        
-        return entity_types
+        return list(fetch_entity_types(graph))
     except Exception as e:
         print(f"❌ Error getting entity types: {e}")
         return []
 
+@functools.lru_cache(maxsize=16)
+def fetch_entities_by_types(
+    graph: Neo4jGraph,
+    entity_types: Tuple[str, ...],
+    limit: int
+) -> Tuple[Dict[str, Any], ...]:
+    """
+    Query the entities of several types in one round-trip. Each type is matched by
+    its label, so Neo4j scans only those nodes, and a node with several of the types
+    is listed under each of them. Results are cached until clear_entity_caches().
+    """
+    # One label scan per type, combined into a single query
+    branches = "\n        UNION ALL\n".join(
+        f"""
+        MATCH (e:{quote_label(entity_type)})
+        RETURN e.id as id, e.name as name, labels(e) as labels, $entity_types[{i}] as type
+        LIMIT $limit"""
+        for i, entity_type in enumerate(entity_types)
+    )
+    query = f"""
+    CALL {{{branches}
+    }}
+    RETURN id, name, labels, type
+    """
+    
+    result = graph.query(query, params={"entity_types": list(entity_types), "limit": limit})
+    
+    return tuple(
+        {
+            "id": record["id"],
+            "name": record["name"],
+            "type": record["type"],
+            "labels": record["labels"]
+        }
+        for record in result
+    )
+
+def get_entities_by_types(
+    graph: Neo4jGraph,
+    entity_types: List[str],
+    limit: int = 1000
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Get entities of several types from the graph with a single query.
+    
+    Args:
+        graph: Neo4j graph connection
+        entity_types: Entity types to fetch
+        limit: Maximum number of entities per type
+        
+    Returns:
+        Dictionary mapping each entity type to its entities
+    """
+    entities_by_type = {entity_type: [] for entity_type in entity_types}
+    if not entity_types:
+        return entities_by_type
+    
+    try:
+        entities = fetch_entities_by_types(graph, tuple(dict.fromkeys(entity_types)), limit)
+    except Exception as e:
+        print(f"❌ Error getting entities of types {', '.join(entity_types)}: {e}")
+        return entities_by_type
+    
+    for entity in entities:
+        entities_by_type[entity["type"]].append(entity)
+    return entities_by_type
+
 def get_entities_by_type(graph: Neo4jGraph, entity_type: str, limit: int = 1000) -> List[Dict[str, Any]]:
     """Get entities of a specific type from the graph."""
+    return get_entities_by_types(graph, [entity_type], limit)[entity_type]
+
+def clear_entity_caches() -> None:
+    """Forget cached entity types and entities after the graph's entities change."""
+    fetch_entity_types.cache_clear()
+    fetch_entities_by_types.cache_clear()
+
+def get_all_entities(graph: Neo4jGraph) -> List[Dict[str, Any]]:
+    """Get all entities from the graph in a single query."""
     try:
-        # Query to get entities of the specified type with their properties
-        query = f"""
-        MATCH (e:{entity_type})
-        RETURN e.id as id, e.name as name, labels(e) as labels
-        LIMIT {limit}
+        # Each node is typed by its first label that is not a system label
+        query = """
+        MATCH (e)
+        WITH e, [label IN labels(e) WHERE NOT label IN $excluded_labels] as entity_labels
+        WHERE size(entity_labels) > 0
+        RETURN e.id as id, e.name as name, entity_labels[0] as type, labels(e) as labels
         """
-        
-        result = graph.query(query)
-        
-        # Process the results
-        entities = []
-        for record in result:
-            entity = {
-                "id": record["id"],
-                "name": record["name"],
-                "type": entity_type,
-                "labels": record["labels"] if "labels" in record else [entity_type]
-            }
-            entities.append(entity)
-        
-        return entities
+        result = graph.query(query, params={"excluded_labels": EXCLUDED_LABELS})
     except Exception as e:
-        print(f"❌ Error getting entities of type {entity_type}: {e}")
+        print(f"❌ Error getting entities: {e}")
         return []
-
-def get_all_entities(graph: Neo4jGraph) -> List[Dict[str, Any]]:
-    """Get all entities from the graph."""
-    entity_types = get_entity_types(graph)
-    all_entities = []
     
-    for entity_type in entity_types:
-        try:
-            entities = get_entities_by_type(graph, entity_type)
-            all_entities.extend(entities)
-            print(f"Found {len(entities)} entities of type '{entity_type}'")
-        except Exception as e:
-            print(f"Error getting entities of type {entity_type}: {e}")
+    all_entities = [
+        {
+            "id": record["id"],
+            "name": record["name"],
+            "type": record["type"],
+            "labels": record["labels"]
+        }
+        for record in result
+    ]
+    
+    type_counts = {}
+    for entity in all_entities:
+        type_counts[entity["type"]] = type_counts.get(entity["type"], 0) + 1
+    for entity_type, count in type_counts.items():
+        print(f"Found {count} entities of type '{entity_type}'")
     
     return all_entities
 
-def check_entity_in_document(entity_name: str, document_content: str) -> bool:
+def check_entity_in_document(entity_name: str, document_content_lower: str) -> bool:
     """
     Check if entity name appears in the document.
+    The document must already be lowercased so repeated checks don't copy it each time.
     Returns True if the entity name is found, False otherwise.
     """
-    if not entity_name or not document_content:
+    if not entity_name or not document_content_lower:
         return False
         
-    # Convert both to lowercase for case-insensitive matching
-    entity_name_lower = entity_name.lower()
-    document_content_lower = document_content.lower()
-    
-    # Check if the entity name appears as a whole word
-    # This uses word boundaries to avoid partial matches
-    pattern = r'\b' + re.escape(entity_name_lower) + r'\b'
-    if re.search(pattern, document_content_lower):
-        return True
-    
-    # If no match with word boundaries, check for a simple substring match
-    if entity_name_lower in document_content_lower:
-        return True
-    
-    return False
+    # Case-insensitive substring match. A whole-word match is always a substring
+    # match as well, so a separate word-boundary regex adds nothing here.
+    return entity_name.lower() in document_content_lower
 
-def check_entity_semantic_match(
-    entity_name: str, 
-    document_content: str, 
-    llm: Ollama,
-    chunk_size: int = 1200
-) -> bool:
+# Words too common to show that an entity is referenced in a document
+STOPWORDS = frozenset([
+    "the", "and", "for", "with", "from", "that", "this", "into", "over", "under",
+    "about", "other", "their", "there", "which", "what", "when", "where", "some"
+])
+
+WORD_PATTERN = re.compile(r"\w+")
+
+def get_document_words(document_content: str) -> FrozenSet[str]:
+    """Get the set of lowercased words in a document, so word lookups don't rescan the text."""
+    return frozenset(WORD_PATTERN.findall(document_content.lower()))
+
+def has_distinctive_word(entity_name: str, document_words: Set[str]) -> bool:
     """
-    Perform a semantic analysis to check if the entity is conceptually present in the document.
-    This is a more sophisticated check than simple string matching.
+    Check if any distinctive word of the entity name occurs in the document.
+    Names made only of short or common words count as present, since their words say nothing.
     """
-    # Create a text splitter for the document
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=200
-    )
-    
-    # Split the document into chunks
-    chunks = text_splitter.split_text(document_content)
+    distinctive_words = [
+        word for word in WORD_PATTERN.findall(entity_name.lower())
+        if len(word) > 3 and word not in STOPWORDS
+    ]
+    if not distinctive_words:
+        return True
+    return any(word in document_words for word in distinctive_words)
+
+def find_entities_in_document(
+    entities: List[Dict[str, Any]],
+    document_content_lower: str,
+    document_words: Optional[FrozenSet[str]] = None
+) -> Set[str]:
+    """
+    Find which entity names appear in the document.
     
-    # Create prompt for semantic analysis
-    prompt_template = """
+    Args:
+        entities: Entities to look for
+        document_content_lower: The lowercased document text
+        document_words: Words of the document from get_document_words, if already computed
+        
+    Returns:
+        Set of lowercased entity names found in the document
+    """
+    entity_names = {e["name"].lower() for e in entities if e.get("name")}
+    if not entity_names or not document_content_lower:
+        return set()
+    
+    if ahocorasick is None:
+        # A name that is a whole word of the document is found without scanning it;
+        # the rest still need the substring check
+        document_words = document_words or frozenset()
+        return {
+            name for name in entity_names
+            if name in document_words or check_entity_in_document(name, document_content_lower)
+        }
+    
+    # Build one automaton over all names and scan the document once
+    automaton = ahocorasick.Automaton()
+    for name in entity_names:
+        automaton.add_word(name, name)
+    automaton.make_automaton()
+    
+    found_names = set()
+    for _, name in automaton.iter(document_content_lower):
+        found_names.add(name)
+        if len(found_names) == len(entity_names):
+            break
+    return found_names
+
+# The semantic prompts keep the fixed instructions first, then the chunk, then
+# the entities. Every check in a round shares the chunk, so the model server
+# can reuse the processed prompt prefix and only has to read the entity part.
+SEMANTIC_MATCH_PROMPT_TEMPLATE = """
     You are an expert analyst tasked with determining if a specific entity is clearly referenced or implied in a text, 
     even if not mentioned by exact name. There are likely to be concepts that are similiarly named, but you will be 
     able to clearly tell them apart from the specific entity.
+
+    -GOAL-
+    Reduce the presence of hallicinations in our dataset.
     
-    ENTITY: {entity_name}
+    -TASK-
+    Analyze the text chunk and determine if it references or directly implies the entity named below the text chunk. 
+    Consider synonyms, descriptions that CLEARLY match the entity, or unambiguous references.
+    
+    RESPOND ONLY with either "YES" or "NO":
+    - "YES" if the entity is referenced or CLEARLY implied
+    - "NO" if there is no clear reference to the entity
     
     TEXT CHUNK:
     {text_chunk}
+    
+    ENTITY: {entity_name}
+    
+    ANSWER:"""
+
+SEMANTIC_BATCH_PROMPT_TEMPLATE = """
+    You are an expert analyst tasked with determining which of several entities are clearly referenced or implied in a text, 
+    even if not mentioned by exact name. There are likely to be concepts that are similiarly named, but you will be 
+    able to clearly tell them apart from the specific entities.
 
     -GOAL-
     Reduce the presence of hallicinations in our dataset.
     
     -TASK-
-    Analyze the text chunk and determine if it references or directly implies the entity named above. 
+    For each entity listed below the text chunk, analyze the text chunk and determine if it references or directly implies that entity. 
     Consider synonyms, descriptions that CLEARLY match the entity, or unambiguous references.
     
-    RESPOND ONLY with either "YES" or "NO":
+    RESPOND ONLY with a JSON object mapping every entity name, exactly as listed, to either "YES" or "NO":
     - "YES" if the entity is referenced or CLEARLY implied
     - "NO" if there is no clear reference to the entity
-    """
+    Example: {{"First Entity": "YES", "Second Entity": "NO"}}
     
-    prompt = PromptTemplate.from_template(prompt_template)
-    chain = prompt | llm | StrOutputParser()
+    TEXT CHUNK:
+    {text_chunk}
     
-    # Check a reasonable number of chunks
-    max_chunks_to_check = min(5, len(chunks))
-    print(f"Performing semantic analysis on {max_chunks_to_check} chunks...")
+    ENTITIES:
+    {entity_names}
+    
+    ANSWER:"""
+
+# Number of leading document chunks checked during semantic analysis
+SEMANTIC_MAX_CHUNKS = 5
+
+# Number of entities scored together in one semantic analysis prompt
+SEMANTIC_BATCH_SIZE = 20
+
+# Output token limits for semantic analysis answers: one YES/NO word, or a
+# JSON map with roughly this many tokens per entity plus the braces
+SEMANTIC_ANSWER_MAX_TOKENS = 2
+SEMANTIC_BATCH_TOKENS_PER_ENTITY = 12
+
+# Number of semantic analysis requests sent to Ollama at once
+SEMANTIC_MAX_CONCURRENCY = 8
+
+def get_semantic_chunks(document_content: str, chunk_size: int = 1200) -> List[str]:
+    """Split the document and return the chunks worth checking during semantic analysis."""
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=200
+    )
+    chunks = text_splitter.split_text(document_content)
     
-    for i in range(max_chunks_to_check):
+    # Check a reasonable number of chunks, skipping very short ones
+    return [chunk for chunk in chunks[:SEMANTIC_MAX_CHUNKS] if len(chunk) >= 100]
+
+def with_output_limit(llm: Ollama, max_tokens: int):
+    """Bind greedy decoding and an output token limit to the LLM for short classification answers."""
+    # Ollama calls the limit num_predict; OpenAI-compatible servers call it max_tokens
+    limit = {"num_predict": max_tokens} if isinstance(llm, Ollama) else {"max_tokens": max_tokens}
+    # No stop=["\n"]: models often start the answer after "ANSWER:" with a newline, which
+    # would end the YES/NO answer empty, and the batched answer is multi-line JSON. The
+    # token limit already ends generation right after the answer.
+    return llm.bind(temperature=0.0, **limit)
+
+def is_yes_answer(answer: str) -> bool:
+    """Return True if a YES/NO answer from the LLM is YES."""
+    return answer.strip().strip('"\'').upper().startswith("YES")
+
+def get_semantic_chain(llm: Ollama):
+    """Build the YES/NO chain used for semantic analysis."""
+    prompt = PromptTemplate.from_template(SEMANTIC_MATCH_PROMPT_TEMPLATE)
+    return prompt | with_output_limit(llm, SEMANTIC_ANSWER_MAX_TOKENS) | StrOutputParser()
+
+def get_semantic_batch_chain(llm: Ollama, batch_size: int = SEMANTIC_BATCH_SIZE):
+    """Build the chain that scores several entities against one chunk."""
+    prompt = PromptTemplate.from_template(SEMANTIC_BATCH_PROMPT_TEMPLATE)
+    max_tokens = 16 + batch_size * SEMANTIC_BATCH_TOKENS_PER_ENTITY
+    return prompt | with_output_limit(llm, max_tokens) | StrOutputParser()
+
+def normalize_entity_name(name: str) -> str:
+    """Normalize an entity name for comparison: lowercase with collapsed whitespace."""
+    return " ".join(name.lower().split())
+
+def parse_json(json_str: str) -> Any:
+    """Parse a JSON string with orjson when available. Raises json.JSONDecodeError on bad input."""
+    if orjson is not None:
+        # orjson.JSONDecodeError is a subclass of json.JSONDecodeError
+        return orjson.loads(json_str)
+    return json.loads(json_str)
+
+def parse_llm_json(response: str) -> Any:
+    """
+    Parse the JSON object in an LLM response, ignoring any text around it.
+    Malformed JSON is repaired with json_repair when it is installed.
+    Raises ValueError if no JSON can be recovered.
+    """
+    json_start = response.find('{')
+    json_end = response.rfind('}') + 1
+    if json_start >= 0 and json_end > json_start:
         try:
-            chunk = chunks[i]
-            # Skip very short chunks
-            if len(chunk) < 100:
-                continue
-                
-            # Ask the LLM if this chunk references the entity
-            response = chain.invoke({
-                "entity_name": entity_name,
-                "text_chunk": chunk
-            }).strip().upper()
-            
-            if response == "YES":
-                return True
-                
-        except Exception as e:
-            print(f"Error during semantic analysis: {e}")
+            return parse_json(response[json_start:json_end])
+        except ValueError as e:
+            error = e
+    else:
+        error = ValueError("No JSON object found in response")
     
-    return False
+    if repair_json is not None:
+        repaired = repair_json(response)
+        if repaired:
+            return parse_json(repaired)
+    raise error
 
-def get_entity_relationships(graph: Neo4jGraph, entity_id: str) -> List[Dict[str, Any]]:
-    """Get all relationships for a specific entity."""
+def parse_semantic_batch_response(response: str, keys: List[str]) -> Dict[str, bool]:
+    """
+    Parse the JSON answer of a batched semantic analysis prompt.
+    
+    Args:
+        response: Raw LLM response
+        keys: Normalized names of the entities in the prompt
+        
+    Returns:
+        Dictionary mapping each answered key to whether the entity was confirmed
+    """
     try:
-        # Query to get relationships
-        query = """
-        MATCH (e {id: $entity_id})-[r]->(target)
-        RETURN type(r) as relationship_type, target.id as target_id, target.name as target_name
-        UNION
-        MATCH (source)-[r]->(e {id: $entity_id})
-        RETURN type(r) as relationship_type, source.id as source_id, source.name as source_name
-        """
+        result = parse_llm_json(response)
+    except ValueError:
+        return {}
+    if not isinstance(result, dict):
+        return {}
+    
+    expected_keys = set(keys)
+    answers = {}
+    for name, answer in result.items():
+        key = normalize_entity_name(str(name))
+        if key in expected_keys and isinstance(answer, str):
+            answers[key] = is_yes_answer(answer)
+    return answers
+
+def check_entities_semantic_match(
+    entity_names: List[str],
+    chunks: List[str],
+    llm: Ollama,
+    max_concurrency: int = SEMANTIC_MAX_CONCURRENCY,
+    batch_size: int = SEMANTIC_BATCH_SIZE
+) -> Set[str]:
+    """
+    Perform a semantic analysis to check which entities are conceptually present in the document.
+    This is a more sophisticated check than simple string matching.
+    
+    Each round checks one chunk for every entity that is still unconfirmed, so
+    entities confirmed by an earlier chunk skip the remaining ones. Up to
+    batch_size entities are scored in a single prompt, and the prompts are sent
+    through chain.batch so Ollama works on several requests at a time. Entities
+    the batched answer does not cover are checked with the single-entity prompt.
+    
+    Args:
+        entity_names: Names of the entities to check
+        chunks: Document chunks from get_semantic_chunks
+        llm: Ollama model for semantic analysis
+        max_concurrency: Maximum number of LLM requests in flight
+        batch_size: Number of entities per prompt (1 uses only the single-entity prompt)
+        
+    Returns:
+        Set of entity names confirmed through semantic analysis
+    """
+    chain = get_semantic_chain(llm)
+    batch_chain = get_semantic_batch_chain(llm, batch_size)
+    config = {"max_concurrency": max_concurrency}
+    
+    # Names that differ only in case or spacing (e.g. the same entity under two
+    # types) refer to the same mention, so each group is checked only once
+    names_by_key = {}
+    for name in entity_names:
+        names_by_key.setdefault(normalize_entity_name(name), []).append(name)
+    
+    pending = list(names_by_key)
+    confirmed_keys = set()
+    
+    print(f"Performing semantic analysis on {len(chunks)} chunks for {len(pending)} distinct entity names...")
+    
+    for i, chunk in enumerate(chunks):
+        if not pending:
+            break
         
-        result = graph.query(query, params={"entity_id": entity_id})
+        answers = {}
+        if batch_size > 1:
+            batches = [pending[j:j + batch_size] for j in range(0, len(pending), batch_size)]
+            responses = batch_chain.batch(
+                [
+                    {
+                        "entity_names": "\n".join(f"- {names_by_key[key][0]}" for key in batch),
+                        "text_chunk": chunk
+                    }
+                    for batch in batches
+                ],
+                config=config,
+                return_exceptions=True
+            )
+            for batch, response in zip(batches, responses):
+                if isinstance(response, Exception):
+                    print(f"Error during batched semantic analysis: {response}")
+                    continue
+                answers.update(parse_semantic_batch_response(response, batch))
         
-        return result
-    except Exception as e:
-        print(f"❌ Error getting relationships for entity {entity_id}: {e}")
-        return []
+        # Ask about entities without a batched answer one at a time
+        unanswered = [key for key in pending if key not in answers]
+        if unanswered:
+            responses = chain.batch(
+                [{"entity_name": names_by_key[key][0], "text_chunk": chunk} for key in unanswered],
+                config=config,
+                return_exceptions=True
+            )
+            for key, response in zip(unanswered, responses):
+                if isinstance(response, Exception):
+                    print(f"Error during semantic analysis of {names_by_key[key][0]}: {response}")
+                    continue
+                answers[key] = is_yes_answer(response)
+        
+        confirmed_keys.update(key for key in pending if answers.get(key))
+        pending = [key for key in pending if not answers.get(key)]
+        
+        print(f"Chunk {i+1}/{len(chunks)}: {len(confirmed_keys)} names confirmed, {len(pending)} unconfirmed")
+    
+    return {name for key in confirmed_keys for name in names_by_key[key]}
 
-def delete_entity_and_relationships(graph: Neo4jGraph, entity_id: str) -> bool:
-    """Delete an entity and its relationships from the graph."""
-    try:
-        # Delete relationships first
-        rel_query = """
-        MATCH (e {id: $entity_id})-[r]-()
-        DELETE r
-        """
-        graph.query(rel_query, params={"entity_id": entity_id})
+def get_relationships_for_entities(
+    graph: Neo4jGraph,
+    entities: List[Dict[str, Any]]
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Get the relationships of many entities with one query per entity type.
+    
+    Args:
+        graph: Neo4j graph connection
+        entities: Entities to look up, with their id and type
         
-        # Then delete the entity
-        entity_query = """
-        MATCH (e {id: $entity_id})
-        DELETE e
+    Returns:
+        Dictionary mapping entity IDs to their relationships. Outgoing relationships
+        have target_id/target_name and incoming ones have source_id/source_name.
+    """
+    # Group IDs by type so each query matches on a label and uses its id index
+    ids_by_type = {}
+    for entity in entities:
+        ids_by_type.setdefault(entity.get("type"), []).append(entity.get("id"))
+    
+    relationships_by_id = {}
+    for entity_type, entity_ids in ids_by_type.items():
+        label = f":{quote_label(entity_type)}" if entity_type else ""
+        query = f"""
+        UNWIND $entity_ids AS entity_id
+        MATCH (e{label} {{id: entity_id}})-[r]-(other)
+        RETURN entity_id, type(r) as relationship_type, startNode(r) = e as outgoing,
+               other.id as other_id, other.name as other_name
         """
-        graph.query(entity_query, params={"entity_id": entity_id})
         
+        try:
+            result = graph.query(query, params={"entity_ids": entity_ids})
+        except Exception as e:
+            print(f"❌ Error getting relationships for {len(entity_ids)} entities of type {entity_type}: {e}")
+            continue
+        
+        for record in result:
+            if record["outgoing"]:
+                relationship = {
+                    "relationship_type": record["relationship_type"],
+                    "target_id": record["other_id"],
+                    "target_name": record["other_name"]
+                }
+            else:
+                relationship = {
+                    "relationship_type": record["relationship_type"],
+                    "source_id": record["other_id"],
+                    "source_name": record["other_name"]
+                }
+            relationships_by_id.setdefault(record["entity_id"], []).append(relationship)
+    
+    return relationships_by_id
+
+def get_entity_relationships(graph: Neo4jGraph, entity_id: str, entity_type: str = None) -> List[Dict[str, Any]]:
+    """Get all relationships for a specific entity. Passing the entity type lets Neo4j use the id index."""
+    entity = {"id": entity_id, "type": entity_type}
+    return get_relationships_for_entities(graph, [entity]).get(entity_id, [])
+
+def delete_entity_and_relationships(graph: Neo4jGraph, entity_id: str, entity_type: str = None) -> bool:
+    """Delete an entity and its relationships from the graph."""
+    label = f":{quote_label(entity_type)}" if entity_type else ""
+    try:
+        graph.query(f"MATCH (e{label} {{id: $entity_id}}) DETACH DELETE e", params={"entity_id": entity_id})
+        clear_entity_caches()
         return True
     except Exception as e:
         print(f"❌ Error deleting entity {entity_id}: {e}")
         return False
 
+def delete_entities_and_relationships(
+    graph: Neo4jGraph,
+    entities: List[Dict[str, Any]],
+    batch_size: int = DELETE_BATCH_SIZE
+) -> Dict[str, Optional[int]]:
+    """
+    Delete many entities and their relationships from the graph.
+    
+    Args:
+        graph: Neo4j graph connection
+        entities: Entities to delete, with their id and type
+        batch_size: Number of entities deleted per transaction
+        
+    Returns:
+        Dictionary mapping the ID of each deleted entity to the number of
+        relationships removed with it (None if the count is unknown)
+    """
+    # Group IDs by type so each query matches on a label and uses its id index
+    ids_by_type = {}
+    for entity in entities:
+        ids_by_type.setdefault(entity.get("type"), []).append(entity.get("id"))
+    
+    deleted_ids = {}
+    for entity_type, entity_ids in ids_by_type.items():
+        label = f":{quote_label(entity_type)}" if entity_type else ""
+        # The server commits every batch_size rows itself, so all IDs of a type
+        # are sent in a single query
+        query = f"""
+        UNWIND $entity_ids AS entity_id
+        CALL {{
+            WITH entity_id
+            MATCH (e{label} {{id: entity_id}})
+            WITH e, COUNT {{ (e)--() }} AS relationships
+            DETACH DELETE e
+            RETURN count(*) AS deleted, sum(relationships) AS relationships
+        }} IN TRANSACTIONS OF {int(batch_size)} ROWS
+        WITH entity_id, deleted, relationships
+        WHERE deleted > 0
+        RETURN entity_id, sum(relationships) AS relationships
+        """
+        
+        try:
+            result = graph.query(query, params={"entity_ids": entity_ids})
+            deleted_ids.update((record["entity_id"], record["relationships"]) for record in result)
+        except Exception as e:
+            print(f"❌ Error deleting {len(entity_ids)} entities of type {entity_type}: {e}")
+            # Batches committed before the error stay deleted; find out which
+            try:
+                remaining = graph.query(
+                    f"UNWIND $entity_ids AS entity_id MATCH (e{label} {{id: entity_id}}) RETURN DISTINCT entity_id",
+                    params={"entity_ids": entity_ids}
+                )
+                remaining_ids = {record["entity_id"] for record in remaining}
+                deleted_ids.update(
+                    (entity_id, None) for entity_id in entity_ids
+                    if entity_id not in remaining_ids and entity_id not in deleted_ids
+                )
+            except Exception as e:
+                print(f"❌ Could not check which entities of type {entity_type} were deleted: {e}")
+    
+    if deleted_ids:
+        clear_entity_caches()
+    return deleted_ids
+
+def report_deleted_entities(
+    entities: List[Dict[str, Any]],
+    deleted_ids: Dict[str, Optional[int]]
+) -> List[Dict[str, Any]]:
+    """Print the outcome of a bulk deletion per entity and return the entities that were deleted."""
+    deleted_entities = []
+    for entity in entities:
+        if entity.get("id") in deleted_ids:
+            relationship_count = deleted_ids[entity.get("id")]
+            if relationship_count is None:
+                print(f"✓ Entity deleted: {entity.get('name')}")
+            else:
+                print(f"✓ Entity deleted: {entity.get('name')} ({relationship_count} relationships removed)")
+            deleted_entities.append(entity)
+        else:
+            print(f"❌ Failed to delete entity: {entity.get('name')}")
+    return deleted_entities
+
 def generate_validation_report(
     all_entities: List[Dict[str, Any]],
     missing_entities: List[Dict[str, Any]],
@@ -351,7 +920,12 @@ def validate_entities(
     document_path: str, 
     use_semantic_analysis: bool = False,
     llm: Ollama = None,
-    entity_types: List[str] = None
+    entity_types: List[str] = None,
+    max_concurrency: int = SEMANTIC_MAX_CONCURRENCY,
+    semantic_batch_size: int = SEMANTIC_BATCH_SIZE,
+    word_prefilter: bool = False,
+    document_content: Optional[str] = None,
+    document_words: Optional[FrozenSet[str]] = None
 ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
     """
     Validate entities against a document to find those that don't appear in the document.
@@ -362,14 +936,20 @@ def validate_entities(
         use_semantic_analysis: Whether to use LLM for semantic analysis
         llm: Ollama model for semantic analysis
         entity_types: List of entity types to validate (if None, validate all)
+        max_concurrency: Maximum number of semantic analysis requests in flight
+        semantic_batch_size: Number of entities scored per semantic analysis prompt
+        word_prefilter: Skip semantic analysis for entities with no distinctive word in the document
+        document_content: Content of the document if already loaded (read from document_path otherwise)
+        document_words: Words of the document from get_document_words, if already computed
         
     Returns:
         Tuple containing all entities and missing entities
     """
     print(f"\nValidating entities against document: {document_path}")
     
-    # Load document content
-    document_content = load_document(document_path)
+    # Load document content unless the caller already has it
+    if document_content is None:
+        document_content = load_document(document_path)
     if not document_content:
         print("❌ Failed to load document content")
         return [], []
@@ -378,9 +958,11 @@ def validate_entities(
     
     # Get all entities or entities of specific types
     if entity_types:
-        all_entities = []
-        for entity_type in entity_types:
-            all_entities.extend(get_entities_by_type(graph, entity_type))
+        all_entities = [
+            entity
+            for entities in get_entities_by_types(graph, entity_types).values()
+            for entity in entities
+        ]
         print(f"Found {len(all_entities)} entities of types {', '.join(entity_types)}")
     else:
         all_entities = get_all_entities(graph)
@@ -390,77 +972,177 @@ def validate_entities(
     missing_entities = []
     
     print("\nChecking entities against document...")
+    document_content_lower = document_content.lower()
+    found_names = find_entities_in_document(all_entities, document_content_lower, document_words)
     for i, entity in enumerate(all_entities):
         entity_name = entity.get("name", "")
-        entity_id = entity.get("id", "")
-        entity_type = entity.get("type", "Unknown")
         
         # Skip entities without a name
         if not entity_name:
             continue
             
         # String matching check
-        if check_entity_in_document(entity_name, document_content):
+        if entity_name.lower() in found_names:
             continue
         
-        # Semantic analysis check if enabled and entity wasn't found by string matching
-        if use_semantic_analysis and llm:
-            print(f"\nPerforming semantic analysis for entity: {entity_name} ({entity_type})")
-            if check_entity_semantic_match(entity_name, document_content, llm):
-                print(f"✓ Entity found through semantic analysis: {entity_name}")
-                continue
-        
-        # If we get here, the entity wasn't found
+        # If we get here, the entity wasn't found by string matching
         missing_entities.append(entity)
         
         # Print progress occasionally
         if (i+1) % 10 == 0 or i == len(all_entities) - 1:
             print(f"Progress: {i+1}/{len(all_entities)} entities checked, {len(missing_entities)} missing")
     
+    # Semantic analysis check if enabled, for entities not found by string matching
+    if use_semantic_analysis and llm and missing_entities:
+        semantic_candidates = missing_entities
+        if word_prefilter:
+            if document_words is None:
+                document_words = frozenset(WORD_PATTERN.findall(document_content_lower))
+            semantic_candidates = [
+                entity for entity in missing_entities
+                if has_distinctive_word(entity["name"], document_words)
+            ]
+            print(f"\nSkipping semantic analysis for {len(missing_entities) - len(semantic_candidates)} entities with no distinctive word in the document")
+        
+        print(f"\nPerforming semantic analysis for {len(semantic_candidates)} entities")
+        confirmed_names = check_entities_semantic_match(
+            [entity["name"] for entity in semantic_candidates],
+            get_semantic_chunks(document_content),
+            llm,
+            max_concurrency=max_concurrency,
+            batch_size=semantic_batch_size
+        )
+        
+        for entity in missing_entities:
+            if entity["name"] in confirmed_names:
+                print(f"✓ Entity found through semantic analysis: {entity['name']} ({entity.get('type', 'Unknown')})")
+        missing_entities = [entity for entity in missing_entities if entity["name"] not in confirmed_names]
+        print(f"{len(missing_entities)} entities still missing after semantic analysis")
+    
     return all_entities, missing_entities
 
+# Number of existing entity names listed in each discovery prompt
+EXISTING_ENTITIES_PROMPT_LIMIT = 50
+
+# Prompt for discovering entities of several types with a single call per chunk
+BATCH_DISCOVERY_PROMPT_TEMPLATE = """
+You are an expert entity extractor. Your task is to identify NEW entities of several types in the text.
+
+For each entity type below, identify entities of that type in the text that are NOT in its list of
+existing entities. Look for clear, explicit mentions only.
+
+For each NEW entity found, provide:
+1. The name of the entity
+2. A brief description or context from the text
+3. The exact text snippet where it was mentioned
+
+Return your findings as a JSON object with one key per entity type, exactly as the types are named below:
+{{
+  "EntityType": [
+    {{
+      "name": "Entity Name",
+      "description": "Brief description based on context",
+      "text_snippet": "... text where the entity was mentioned ..."
+    }},
+    ...
+  ],
+  ...
+}}
+
+Use an empty list for a type with no new entities. Respond ONLY with valid JSON.
+
+ENTITY TYPES AND EXISTING ENTITIES (DO NOT INCLUDE THESE):
+{entity_types}
+
+TEXT CHUNK:
+{text_chunk}
+"""
+
+def parse_discovered_entities(
+    response: str,
+    existing_entity_names: FrozenSet[str],
+    chunk_index: int
+) -> List[Dict[str, Any]]:
+    """Parse the JSON answer of a discovery prompt and keep only entities that are not in the graph yet."""
+    try:
+        result = parse_llm_json(response)
+    except ValueError as e:
+        print(f"  ❌ Error parsing JSON in chunk {chunk_index+1}: {e}")
+        return []
+    if not isinstance(result, dict):
+        return []
+    return filter_new_entities(result.get("entities", []), existing_entity_names, chunk_index)
+
+def filter_new_entities(
+    entities: Any,
+    existing_entity_names: FrozenSet[str],
+    chunk_index: int
+) -> List[Dict[str, Any]]:
+    """Keep the well-formed discovered entities whose names are not in the graph yet."""
+    if not isinstance(entities, list):
+        return []
+    
+    # Filter out any entities that somehow match existing ones
+    new_entities = []
+    for entity in entities:
+        if not isinstance(entity, dict):
+            continue
+        entity_name = entity.get("name", "")
+        if isinstance(entity_name, str) and entity_name and entity_name.lower() not in existing_entity_names:
+            # Add chunk index for reference
+            entity["chunk_index"] = chunk_index
+            new_entities.append(entity)
+    return new_entities
+
+def summarize_existing_entities(existing_entities: List[Dict[str, Any]]) -> Tuple[FrozenSet[str], str]:
+    """
+    Build the lookup set and the prompt listing of existing entities for discovery.
+    
+    Only the first names are listed, since every listed name is repeated in every
+    chunk's prompt and discoveries matching an existing name are filtered out afterwards anyway.
+    
+    Args:
+        existing_entities: List of existing entities of one type
+        
+    Returns:
+        Tuple of (lowercased existing names, formatted list for the prompt)
+    """
+    existing_names = list(dict.fromkeys(e["name"] for e in existing_entities if e.get("name")))
+    existing_entity_names = frozenset(name.lower() for name in existing_names)
+    
+    existing_entities_list = ", ".join(f"'{name}'" for name in existing_names[:EXISTING_ENTITIES_PROMPT_LIMIT])
+    if len(existing_names) > EXISTING_ENTITIES_PROMPT_LIMIT:
+        existing_entities_list += f"... and {len(existing_names) - EXISTING_ENTITIES_PROMPT_LIMIT} more"
+    return existing_entity_names, existing_entities_list
+
 def discover_new_entities(
-    document_content: str,
+    document_path: str,
     entity_type: str,
     existing_entities: List[Dict[str, Any]],
     llm: Ollama,
     chunk_size: int = 1500,
-    max_entities: int = 5
+    max_entities: int = 5,
+    max_concurrency: int = SEMANTIC_MAX_CONCURRENCY
 ) -> List[Dict[str, Any]]:
     """
     Discover new entities of a specific type in a document that aren't already in the graph.
     
     Args:
-        document_content: The document text
+        document_path: Path to the document, read in chunks as it is processed
         entity_type: Type of entity to look for
         existing_entities: List of existing entities of this type
         llm: Ollama model for entity extraction
         chunk_size: Size of document chunks to process
         max_entities: Maximum number of new entities to discover
+        max_concurrency: Number of chunks sent to the LLM at once
         
     Returns:
         List of discovered entities
     """
-    # Create a text splitter for the document
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=200
-    )
-    
-    # Split the document into chunks
-    chunks = text_splitter.split_text(document_content)
-    print(f"Split document into {len(chunks)} chunks")
-    
-    # Create a set of existing entity names for faster lookup
-    existing_entity_names = {e.get("name", "").lower() for e in existing_entities if e.get("name")}
+    # Create a set of existing entity names for faster lookup and format them for the prompt once
+    existing_entity_names, existing_entities_list = summarize_existing_entities(existing_entities)
     print(f"Found {len(existing_entity_names)} existing {entity_type} entities to exclude")
     
-    # Format existing entities for the prompt
-    existing_entities_list = ", ".join([f"'{e.get('name', '')}'" for e in existing_entities if e.get("name")])
-    if len(existing_entities_list) > 1000:
-        # Truncate if too long for the prompt
-        existing_entities_list = existing_entities_list[:1000] + "... and more"
-    
     # Create prompt for entity discovery
     prompt_template = """
     You are an expert entity extractor. Your task is to identify NEW entities of a specific type in the text.
@@ -502,67 +1184,215 @@ def discover_new_entities(
     prompt = PromptTemplate.from_template(prompt_template)
     chain = prompt | llm | StrOutputParser()
     
-    # Process each chunk
+    # Process the chunks in windows of concurrent LLM calls, skipping very short chunks
     discovered_entities = []
     chunks_with_discoveries = 0
+    chunks = (
+        (i, chunk) for i, chunk in enumerate(iter_document_chunks(document_path, chunk_size))
+        if len(chunk) >= 100
+    )
     
     print(f"Searching for new {entity_type} entities across document chunks...")
-    for i, chunk in enumerate(chunks):
-        if len(discovered_entities) >= max_entities:
-            print(f"Reached maximum of {max_entities} new entities. Stopping search.")
+    while len(discovered_entities) < max_entities:
+        window = list(itertools.islice(chunks, max_concurrency))
+        if not window:
             break
+        
+        print(f"\nProcessing chunks {window[0][0]+1}-{window[-1][0]+1}...")
+        responses = chain.batch(
+            [
+                {
+                    "entity_type": entity_type,
+                    "existing_entities": existing_entities_list,
+                    "text_chunk": chunk
+                }
+                for _, chunk in window
+            ],
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True
+        )
+        
+        for (i, _), response in zip(window, responses):
+            if isinstance(response, Exception):
+                print(f"  ❌ Error processing chunk {i+1}: {response}")
+                continue
             
-        print(f"\nProcessing chunk {i+1}/{len(chunks)}...")
+            new_entities = parse_discovered_entities(response, existing_entity_names, i)
+            if new_entities:
+                chunks_with_discoveries += 1
+                print(f"  ✓ Found {len(new_entities)} potential new entities in chunk {i+1}")
+                discovered_entities.extend(new_entities)
+    
+    if len(discovered_entities) >= max_entities:
+        print(f"Reached maximum of {max_entities} new entities. Stopping search.")
+        discovered_entities = discovered_entities[:max_entities]
+    
+    print(f"\nDiscovery complete. Found {len(discovered_entities)} potential new entities in {chunks_with_discoveries} chunks.")
+    return discovered_entities
+
+def discover_new_entities_batched(
+    document_path: str,
+    entity_types: List[str],
+    existing_by_type: Dict[str, List[Dict[str, Any]]],
+    llm: Ollama,
+    chunk_size: int = 1500,
+    max_entities: int = 5,
+    max_concurrency: int = SEMANTIC_MAX_CONCURRENCY
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Discover new entities of several types at once, with one LLM call per chunk for all types.
+    
+    Args:
+        document_path: Path to the document, read in chunks as it is processed
+        entity_types: Types of entity to look for
+        existing_by_type: Dictionary mapping each entity type to its existing entities
+        llm: Ollama model for entity extraction
+        chunk_size: Size of document chunks to process
+        max_entities: Maximum number of new entities to discover per type
+        max_concurrency: Number of chunks sent to the LLM at once
         
-        try:
-            # Skip very short chunks
-            if len(chunk) < 100:
+    Returns:
+        Dictionary mapping each entity type to its discovered entities
+    """
+    existing_names_by_type = {}
+    type_lines = []
+    for entity_type in entity_types:
+        existing_entity_names, existing_entities_list = summarize_existing_entities(
+            existing_by_type.get(entity_type, [])
+        )
+        existing_names_by_type[entity_type] = existing_entity_names
+        type_lines.append(f"- {entity_type}: {existing_entities_list or 'none'}")
+        print(f"Found {len(existing_entity_names)} existing {entity_type} entities to exclude")
+    
+    # Answers are keyed by type name; match them case-insensitively
+    types_by_key = {entity_type.lower(): entity_type for entity_type in entity_types}
+    
+    prompt = PromptTemplate.from_template(BATCH_DISCOVERY_PROMPT_TEMPLATE)
+    chain = prompt | llm | StrOutputParser()
+    
+    discovered_by_type = {entity_type: [] for entity_type in entity_types}
+    chunks_with_discoveries = 0
+    chunks = (
+        (i, chunk) for i, chunk in enumerate(iter_document_chunks(document_path, chunk_size))
+        if len(chunk) >= 100
+    )
+    
+    print(f"Searching for new entities of {len(entity_types)} types across document chunks...")
+    while any(len(found) < max_entities for found in discovered_by_type.values()):
+        window = list(itertools.islice(chunks, max_concurrency))
+        if not window:
+            break
+        
+        print(f"\nProcessing chunks {window[0][0]+1}-{window[-1][0]+1}...")
+        responses = chain.batch(
+            [
+                {
+                    "entity_types": "\n".join(type_lines),
+                    "text_chunk": chunk
+                }
+                for _, chunk in window
+            ],
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True
+        )
+        
+        for (i, _), response in zip(window, responses):
+            if isinstance(response, Exception):
+                print(f"  ❌ Error processing chunk {i+1}: {response}")
                 continue
-                
-            # Process the chunk with LLM
-            response = chain.invoke({
-                "entity_type": entity_type,
-                "existing_entities": existing_entities_list,
-                "text_chunk": chunk
-            })
             
-            # Extract JSON from response
-            json_start = response.find('{')
-            json_end = response.rfind('}') + 1
+            try:
+                result = parse_llm_json(response)
+            except ValueError as e:
+                print(f"  ❌ Error parsing JSON in chunk {i+1}: {e}")
+                continue
+            if not isinstance(result, dict):
+                continue
             
-            if json_start >= 0 and json_end > json_start:
-                json_str = response[json_start:json_end]
-                try:
-                    result = json.loads(json_str)
-                    entities = result.get("entities", [])
-                    
-                    # Filter out any entities that somehow match existing ones
-                    new_entities = []
-                    for entity in entities:
-                        entity_name = entity.get("name", "")
-                        if entity_name and entity_name.lower() not in existing_entity_names:
-                            # Add chunk index for reference
-                            entity["chunk_index"] = i
-                            new_entities.append(entity)
-                    
-                    if new_entities:
-                        chunks_with_discoveries += 1
-                        print(f"  ✓ Found {len(new_entities)} potential new entities in chunk {i+1}")
-                        discovered_entities.extend(new_entities)
-                except json.JSONDecodeError as e:
-                    print(f"  ❌ Error parsing JSON: {e}")
+            found_in_chunk = 0
+            for key, entities in result.items():
+                entity_type = types_by_key.get(str(key).strip().lower())
+                if entity_type is None:
+                    continue
+                new_entities = filter_new_entities(entities, existing_names_by_type[entity_type], i)
+                discovered_by_type[entity_type].extend(new_entities)
+                found_in_chunk += len(new_entities)
             
-        except Exception as e:
-            print(f"  ❌ Error processing chunk {i+1}: {e}")
+            if found_in_chunk:
+                chunks_with_discoveries += 1
+                print(f"  ✓ Found {found_in_chunk} potential new entities in chunk {i+1}")
+    
+    for entity_type, found in discovered_by_type.items():
+        if len(found) > max_entities:
+            discovered_by_type[entity_type] = found[:max_entities]
+        print(f"  {entity_type}: {len(discovered_by_type[entity_type])} potential new entities")
+    
+    total = sum(len(found) for found in discovered_by_type.values())
+    print(f"\nDiscovery complete. Found {total} potential new entities in {chunks_with_discoveries} chunks.")
+    return discovered_by_type
+
+def add_entities_to_graph(
+    graph: Neo4jGraph,
+    entity_type: str,
+    confirmed_entities: List[Tuple[str, Dict[str, Any]]]
+) -> List[Dict[str, Any]]:
+    """
+    Upsert confirmed discoveries as nodes of one type with a single batched MERGE.
     
-    print(f"\nDiscovery complete. Found {len(discovered_entities)} potential new entities in {chunks_with_discoveries} chunks.")
-    return discovered_entities
+    Args:
+        graph: Neo4j graph connection
+        entity_type: Type (label) of the entities
+        confirmed_entities: Pairs of generated ID and discovered entity
+        
+    Returns:
+        List of entities that were added to the graph, with their ID set
+    """
+    if not confirmed_entities:
+        return []
+    
+    label = quote_label(entity_type)
+    rows = [
+        {
+            "id": entity_id,
+            "props": {
+                "name": entity.get("name", ""),
+                "description": entity.get("description", ""),
+                "source_text": entity.get("text_snippet", "")
+            }
+        }
+        for entity_id, entity in confirmed_entities
+    ]
+    
+    try:
+        # The type may be new to the graph, so make sure MERGE can seek on id
+        graph.query(f"CREATE INDEX IF NOT EXISTS FOR (n:{label}) ON (n.id)")
+        result = graph.query(
+            f"""
+            UNWIND $rows as row
+            MERGE (e:{label} {{id: row.id}})
+            SET e += row.props
+            RETURN e.id as id
+            """,
+            params={"rows": rows}
+        )
+    except Exception as e:
+        print(f"❌ Error adding entities to graph: {e}")
+        return []
+    
+    added_ids = {record["id"] for record in result}
+    added_entities = []
+    for entity_id, entity in confirmed_entities:
+        if entity_id in added_ids:
+            entity["id"] = entity_id
+            added_entities.append(entity)
+        else:
+            print(f"❌ Failed to add entity '{entity.get('name', '')}' to graph")
+    return added_entities
 
 def verify_and_add_entities(
     discovered_entities: List[Dict[str, Any]],
     entity_type: str,
-    graph: Neo4jGraph,
-    document_content: str
+    graph: Neo4jGraph
 ) -> List[Dict[str, Any]]:
     """
     Present discovered entities to the user for verification and add confirmed ones to the graph.
@@ -571,7 +1401,6 @@ def verify_and_add_entities(
         discovered_entities: List of discovered entities
         entity_type: Type of entity
         graph: Neo4j graph connection
-        document_content: Full document content for context
         
     Returns:
         List of entities that were added to the graph
@@ -580,7 +1409,7 @@ def verify_and_add_entities(
         print("No new entities discovered.")
         return []
     
-    added_entities = []
+    confirmed_entities = []
     
     print(f"\n{'='*60}")
     print(f"VERIFICATION OF NEW {entity_type.upper()} ENTITIES")
@@ -609,34 +1438,8 @@ def verify_and_add_entities(
         if confirmation.lower() != 'n':
             # Generate a unique ID for the entity
             entity_id = f"{entity_name.lower().replace(' ', '_')}_{int(time.time() % 10000)}"
-            
-            # Add entity to the graph
-            try:
-                query = f"""
-                CREATE (e:{entity_type} {{
-                    id: $id,
-                    name: $name,
-                    description: $description,
-                    source_text: $text_snippet
-                }})
-                RETURN e.id as id
-                """
-                
-                result = graph.query(query, params={
-                    "id": entity_id,
-                    "name": entity_name,
-                    "description": description,
-                    "text_snippet": text_snippet
-                })
-                
-                if result:
-                    print(f"✓ Added entity '{entity_name}' to graph with ID: {entity_id}")
-                    entity["id"] = entity_id
-                    added_entities.append(entity)
-                else:
-                    print(f"❌ Failed to add entity '{entity_name}' to graph")
-            except Exception as e:
-                print(f"❌ Error adding entity to graph: {e}")
+            confirmed_entities.append((entity_id, entity))
+            print(f"✓ Entity '{entity_name}' will be added to the graph with ID: {entity_id}")
         else:
             print(f"× Skipped adding entity '{entity_name}' to graph")
             
@@ -647,8 +1450,12 @@ def verify_and_add_entities(
                 print(f"\nStopping verification. Processed {i+1} out of {len(discovered_entities)} entities.")
                 break
     
+    # Add all confirmed entities to the graph in one query
+    added_entities = add_entities_to_graph(graph, entity_type, confirmed_entities)
+    
     # Report results
     if added_entities:
+        clear_entity_caches()
         print(f"\n✓ Added {len(added_entities)} new entities to the graph:")
         for entity in added_entities:
             print(f"  - {entity['name']} (ID: {entity['id']})")
@@ -709,11 +1516,17 @@ def main():
     
     # Entity filtering
     parser.add_argument("--entity-type", help="Validate only entities of this type")
-    parser.add_argument("--all-types", action="store_true", help="Validate entities of all types")
+    parser.add_argument("--all-types", action="store_true", help="Validate or discover entities of all types")
     
     # Analysis options
     parser.add_argument("--semantic", action="store_true", help="Use semantic analysis for validation")
     parser.add_argument("--model", default="gemma3:4b", help="LLM model for semantic analysis")
+    parser.add_argument("--backend", choices=["ollama", "vllm"], default="ollama", help="LLM server to use (vllm expects an OpenAI-compatible server at VLLM_BASE_URL)")
+    parser.add_argument("--workers", type=int, default=SEMANTIC_MAX_CONCURRENCY, help="Number of concurrent LLM requests for semantic analysis and discovery")
+    parser.add_argument("--semantic-batch-size", type=int, default=SEMANTIC_BATCH_SIZE, help="Number of entities scored per semantic analysis prompt (1 checks entities one at a time)")
+    parser.add_argument("--word-prefilter", action="store_true", help="Skip semantic analysis for entities that share no distinctive word with the document")
+    parser.add_argument("--llm-cache-dir", default="llm_cache", help="Directory for the cached LLM responses")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Always call the LLM instead of reusing cached responses")
     
     # Action options
     parser.add_argument("--delete", action="store_true", help="Delete entities not found in document")
@@ -726,6 +1539,9 @@ def main():
 
     args = parser.parse_args()
     
+    if not args.no_llm_cache:
+        enable_llm_cache(args.llm_cache_dir)
+    
     # Initialize Neo4j connection
     try:
         graph = initialize_neo4j_connection()
@@ -738,7 +1554,7 @@ def main():
     llm = None
     if args.semantic:
         try:
-            llm = initialize_llm(model_name=args.model)
+            llm = initialize_llm(model_name=args.model, backend=args.backend)
         except Exception as e:
             print(f"\nCould not initialize LLM: {e}")
             print("Semantic analysis will be disabled.")
@@ -827,14 +1643,11 @@ def main():
         
         # If discovery is selected, proceed with discovery process
         if do_discovery:
-            # Load document content
-            document_content = load_document(document_path)
-            if not document_content:
-                print("❌ Failed to load document content")
-                return
+            # Discover entities of the selected type, or of every type when all were selected
+            discovery_types = selected_entity_types or entity_types
             
-            # Get existing entities of the selected type
-            existing_entities = get_entities_by_type(graph, selected_entity_types[0])
+            # Get existing entities of the types to discover
+            existing_by_type = get_entities_by_types(graph, discovery_types)
             
             # Configure max entities
             max_entities = args.max_entities
@@ -852,35 +1665,47 @@ def main():
             if not llm:
                 print("\nInitializing LLM for entity discovery...")
                 try:
-                    llm = initialize_llm(model_name=args.model)
+                    llm = initialize_llm(model_name=args.model, backend=args.backend)
                 except Exception as e:
                     print(f"\nCould not initialize LLM: {e}")
                     print("Entity discovery will be skipped.")
                     do_discovery = False
             
             if do_discovery:
-                # Discover new entities
-                discovered_entities = discover_new_entities(
-                    document_content=document_content,
-                    entity_type=selected_entity_types[0],
-                    existing_entities=existing_entities,
-                    llm=llm,
-                    max_entities=max_entities
-                )
-                
-                # Verify and add entities
-                if discovered_entities:
-                    added_entities = verify_and_add_entities(
-                        discovered_entities=discovered_entities,
-                        entity_type=selected_entity_types[0],
-                        graph=graph,
-                        document_content=document_content
+                # Discover new entities, with one prompt per chunk covering all types when there are several
+                if len(discovery_types) > 1:
+                    discovered_by_type = discover_new_entities_batched(
+                        document_path=document_path,
+                        entity_types=discovery_types,
+                        existing_by_type=existing_by_type,
+                        llm=llm,
+                        max_entities=max_entities,
+                        max_concurrency=args.workers
                     )
-                    
-                    # Generate report
+                else:
+                    discovered_by_type = {
+                        discovery_types[0]: discover_new_entities(
+                            document_path=document_path,
+                            entity_type=discovery_types[0],
+                            existing_entities=existing_by_type[discovery_types[0]],
+                            llm=llm,
+                            max_entities=max_entities,
+                            max_concurrency=args.workers
+                        )
+                    }
+                
+                for entity_type, discovered_entities in discovered_by_type.items():
+                    # Verify and add entities
                     if discovered_entities:
+                        added_entities = verify_and_add_entities(
+                            discovered_entities=discovered_entities,
+                            entity_type=entity_type,
+                            graph=graph
+                        )
+                        
+                        # Generate report
                         report = generate_discovery_report(
-                            entity_type=selected_entity_types[0],
+                            entity_type=entity_type,
                             discovered_entities=discovered_entities,
                             added_entities=added_entities,
                             document_path=document_path
@@ -898,8 +1723,8 @@ def main():
                                 entity_name = entity.get("name", "")
                                 if entity_id:
                                     print(f"  python neo4j_7-neo4j_entity_focused_extraction.py --entity-id {entity_id}")
-                else:
-                    print("\nNo new entities discovered.")
+                    else:
+                        print(f"\nNo new {entity_type} entities discovered.")
         
         # If validation is selected, proceed with the existing validation code
         if do_validation:
@@ -908,19 +1733,26 @@ def main():
             if use_semantic and not llm:
                 print("\nInitializing LLM for semantic analysis...")
                 try:
-                    llm = initialize_llm(model_name=args.model)
+                    llm = initialize_llm(model_name=args.model, backend=args.backend)
                 except Exception as e:
                     print(f"\nCould not initialize LLM: {e}")
                     print("Semantic analysis will be disabled.")
                     use_semantic = False
             
             # Step 4: Validate entities
+            document_content = load_document(document_path)
+            document_words = get_document_words(document_content)
             all_entities, missing_entities = validate_entities(
                 graph=graph,
                 document_path=document_path,
                 use_semantic_analysis=use_semantic,
                 llm=llm,
-                entity_types=selected_entity_types
+                entity_types=selected_entity_types,
+                max_concurrency=args.workers,
+                semantic_batch_size=args.semantic_batch_size,
+                word_prefilter=args.word_prefilter,
+                document_content=document_content,
+                document_words=document_words
             )
         
         # Step 5: Show results and ask for deletion
@@ -932,7 +1764,8 @@ def main():
             delete_option = input("\nDelete these entities? (y/n): ").lower()
             
             if delete_option == 'y':
-                deleted_entities = []
+                # Get relationships of all entities before deleting
+                relationships_by_id = get_relationships_for_entities(graph, missing_entities)
                 
                 for entity in missing_entities:
                     entity_id = entity.get("id")
@@ -940,8 +1773,7 @@ def main():
                     
                     print(f"\nDeleting entity: {entity_name} (ID: {entity_id})")
                     
-                    # Get relationships before deleting
-                    relationships = get_entity_relationships(graph, entity_id)
+                    relationships = relationships_by_id.get(entity_id, [])
                     if relationships:
                         print(f"  This entity has {len(relationships)} relationships:")
                         for rel in relationships[:5]:  # Show first 5 relationships
@@ -952,13 +1784,10 @@ def main():
                         
                         if len(relationships) > 5:
                             print(f"  - ... and {len(relationships) - 5} more")
-                    
-                    # Delete the entity
-                    if delete_entity_and_relationships(graph, entity_id):
-                        print(f"✓ Entity deleted: {entity_name}")
-                        deleted_entities.append(entity)
-                    else:
-                        print(f"❌ Failed to delete entity: {entity_name}")
+                
+                # Delete the entities
+                deleted_ids = delete_entities_and_relationships(graph, missing_entities)
+                deleted_entities = report_deleted_entities(missing_entities, deleted_ids)
                 
                 print(f"\n✓ Deleted {len(deleted_entities)} out of {len(missing_entities)} missing entities")
                 
@@ -999,62 +1828,74 @@ def main():
         
         # Handle different modes
         if args.discover:
-            # Determine entity types to validate
-            selected_entity_types = None
+            # Determine entity types to discover
             if args.entity_type:
                 selected_entity_types = [args.entity_type]
                 print(f"Discovering new entities of type: {args.entity_type}")
+            elif args.all_types:
+                selected_entity_types = get_entity_types(graph)
+                print("Discovering new entities of all types")
             else:
-                print("Please specify an entity type with --entity-type")
-                return
-                    
-            # Load document content
-            document_content = load_document(args.document)
-            if not document_content:
-                print("❌ Failed to load document content")
+                print("Please specify an entity type with --entity-type or use --all-types")
                 return
             
-            # Get existing entities of the selected type
-            existing_entities = get_entities_by_type(graph, selected_entity_types[0])
+            if not selected_entity_types:
+                print("No entity types found in the graph")
+                return
+                    
+            # Get existing entities of the selected types
+            existing_by_type = get_entities_by_types(graph, selected_entity_types)
             
             # Initialize LLM
             try:
                 if not llm:
-                    llm = initialize_llm(model_name=args.model)
+                    llm = initialize_llm(model_name=args.model, backend=args.backend)
             except Exception as e:
                 print(f"\nCould not initialize LLM: {e}")
                 return
             
-            # Discover new entities
-            discovered_entities = discover_new_entities(
-                document_content=document_content,
-                entity_type=selected_entity_types[0],
-                existing_entities=existing_entities,
-                llm=llm,
-                max_entities=args.max_entities
-            )
-            
-            # Verify and add entities
-            if discovered_entities:
-                added_entities = verify_and_add_entities(
-                    discovered_entities=discovered_entities,
-                    entity_type=selected_entity_types[0],
-                    graph=graph,
-                    document_content=document_content
+            # Discover new entities, with one prompt per chunk covering all types when there are several
+            if len(selected_entity_types) > 1:
+                discovered_by_type = discover_new_entities_batched(
+                    document_path=args.document,
+                    entity_types=selected_entity_types,
+                    existing_by_type=existing_by_type,
+                    llm=llm,
+                    max_entities=args.max_entities,
+                    max_concurrency=args.workers
                 )
-                
-                # Generate report
+            else:
+                discovered_by_type = {
+                    selected_entity_types[0]: discover_new_entities(
+                        document_path=args.document,
+                        entity_type=selected_entity_types[0],
+                        existing_entities=existing_by_type[selected_entity_types[0]],
+                        llm=llm,
+                        max_entities=args.max_entities,
+                        max_concurrency=args.workers
+                    )
+                }
+            
+            for entity_type, discovered_entities in discovered_by_type.items():
+                # Verify and add entities
                 if discovered_entities:
+                    added_entities = verify_and_add_entities(
+                        discovered_entities=discovered_entities,
+                        entity_type=entity_type,
+                        graph=graph
+                    )
+                    
+                    # Generate report
                     report = generate_discovery_report(
-                        entity_type=selected_entity_types[0],
+                        entity_type=entity_type,
                         discovered_entities=discovered_entities,
                         added_entities=added_entities,
                         document_path=args.document
                     )
                     
                     save_report(report, "discovery_reports")
-            else:
-                print("\nNo new entities discovered.")
+                else:
+                    print(f"\nNo new {entity_type} entities discovered.")
         else:
             # Determine entity types to validate
             selected_entity_types = None
@@ -1068,12 +1909,19 @@ def main():
                 return
                     
             # Validate entities
+            document_content = load_document(args.document)
+            document_words = get_document_words(document_content)
             all_entities, missing_entities = validate_entities(
                 graph=graph,
                 document_path=args.document,
                 use_semantic_analysis=args.semantic,
                 llm=llm,
-                entity_types=selected_entity_types
+                entity_types=selected_entity_types,
+                max_concurrency=args.workers,
+                semantic_batch_size=args.semantic_batch_size,
+                word_prefilter=args.word_prefilter,
+                document_content=document_content,
+                document_words=document_words
             )
             
             # Delete entities if requested
@@ -1081,15 +1929,8 @@ def main():
             if args.delete and missing_entities:
                 print(f"\nDeleting {len(missing_entities)} entities not found in document...")
                 
-                for entity in missing_entities:
-                    entity_id = entity.get("id")
-                    entity_name = entity.get("name")
-                    
-                    if delete_entity_and_relationships(graph, entity_id):
-                        print(f"✓ Entity deleted: {entity_name}")
-                        deleted_entities.append(entity)
-                    else:
-                        print(f"❌ Failed to delete entity: {entity_name}")
+                deleted_ids = delete_entities_and_relationships(graph, missing_entities)
+                deleted_entities = report_deleted_entities(missing_entities, deleted_ids)
                         
                 print(f"\n✓ Deleted {len(deleted_entities)} out of {len(missing_entities)} missing entities")
             